@@ -0,0 +1,87 @@
+"""
+Temps d'import à froid des modules du paquet, chacun dans un nouvel interpréteur, et contrôle des dépendances
+lourdes chargées par l'import (elles ne doivent l'être qu'au premier appel des fonctions qui les utilisent).
+
+Exemples :
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --repeat 5 --output imports.json
+    python benchmarks/import_time.py --max-seconds 1.0
+
+Le script sort avec le code 1 si un module charge une dépendance interdite ou dépasse --max-seconds.
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+MODULES = [
+    "src",
+    "src.instrumentation",
+    "src.panel",
+    "src.risk_metrics",
+    "src.factor_models",
+    "src.covariance",
+    "src.portfolio_optimization",
+    "src.backtesting",
+    "src.data_loader",
+    "src.reporting",
+]
+
+#Dépendances qu'aucun import de module ne doit charger
+HEAVY = ["matplotlib", "seaborn", "yfinance", "sklearn", "statsmodels", "scipy.stats", "joblib"]
+
+_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def measure(module: str, repeat: int = 3) -> dict:
+    """
+    Meilleur temps d'import sur repeat interpréteurs neufs, et dépendances lourdes chargées
+    """
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY)],
+                                cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    return {"module": module, "seconds": min(run["seconds"] for run in runs), "loaded": runs[0]["loaded"]}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="*", default=MODULES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-seconds", type=float, help="Temps d'import maximal toléré par module")
+    parser.add_argument("--output", help="Résultats JSON")
+    args = parser.parse_args(argv)
+
+    failed = False
+    results = []
+    for module in args.modules:
+        record = measure(module, args.repeat)
+        results.append(record)
+        status = ""
+        if record["loaded"]:
+            status = "CHARGE " + ", ".join(record["loaded"])
+            failed = True
+        if args.max_seconds is not None and record["seconds"] > args.max_seconds:
+            status = (status + " TROP LENT").strip()
+            failed = True
+        print(f"{module:<30} {record['seconds']:>8.3f}s {status}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""
+Benchmarks des fonctions du pipeline sur des univers synthétiques (aucun accès réseau).
+
+Exemples :
+    python benchmarks/run_benchmarks.py                               # profil rapide
+    python benchmarks/run_benchmarks.py --profile full --output results.json --csv results.csv
+    python benchmarks/run_benchmarks.py --save-baseline benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json --threshold 0.25
+
+Avec --baseline, le script sort avec le code 1 si un cas est plus lent que la référence de plus de threshold.
+"""
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import platform
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from src.risk_metrics import compute_returns, compute_sharpe_ratio
+from src.portfolio_optimization import max_sharpe_portfolio, min_variance_portfolio, compute_efficient_frontier, custom_objective_portfolio
+from src.backtesting import rolling_backtest
+from src.factor_models import run_capm, run_fama_french_stats, rolling_factor_betas
+
+
+#### Univers synthétiques
+
+def synthetic_panel(n_assets: int, n_days: int, seed: int = 0) -> dict:
+    """
+    Panel de prix/rendements à structure 3 facteurs, reproductible (seed)
+
+    Returns:
+        dict: 'prices', 'returns', 'factors', 'benchmark', 'mu', 'cov'
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2000-01-03", periods=n_days + 1)
+    tickers = [f"A{i:04d}" for i in range(n_assets)]
+
+    factors = rng.normal(0.0003, 0.01, (n_days + 1, 3))
+    betas = rng.normal([1.0, 0.2, 0.1], 0.3, (n_assets, 3))
+    idio = rng.normal(0.0, 0.015, (n_days + 1, n_assets)) * rng.uniform(0.5, 1.5, n_assets)
+    log_returns = factors @ betas.T + idio
+    log_returns[0] = 0.0
+
+    prices = pd.DataFrame(100 * np.exp(np.cumsum(log_returns, axis=0)), index=dates, columns=tickers)
+    returns = compute_returns(prices)
+    factors = pd.DataFrame(factors[1:], index=returns.index, columns=["MKT", "SMB", "HML"])
+    benchmark = pd.Series(100 * np.exp(np.cumsum(factors["MKT"].values)), index=returns.index)
+
+    return {
+        "prices": prices,
+        "returns": returns,
+        "factors": factors,
+        "benchmark": benchmark,
+        "mu": returns.mean().values,
+        "cov": returns.cov().values,
+    }
+
+
+def _inverse_variance(mu, cov):
+    weights = 1 / np.diag(cov)
+    return weights / weights.sum()
+
+
+def _min_variance_finite_diff(cov):
+    #Même problème que min_variance_portfolio, gradient estimé par différences finies (référence de l'accélération)
+    scale = 1.0 / np.mean(np.diag(cov))
+    return custom_objective_portfolio(lambda w: w @ cov @ w * scale, np.zeros(len(cov)), cov)
+
+
+#### Cas de benchmark : nom -> (fabrique du callable à partir du panel, tailles par profil)
+
+QUICK_SIZES = [(10, 250), (50, 1000), (200, 2520)]
+FULL_SIZES = [(10, 250), (50, 1000), (200, 2520), (500, 5040), (2000, 10000)]
+
+CASES = {
+    "compute_returns": (lambda p: lambda: compute_returns(p["prices"]), {}),
+    "compute_sharpe_ratio": (lambda p: lambda: compute_sharpe_ratio(p["returns"]), {}),
+    "min_variance_portfolio": (lambda p: lambda: min_variance_portfolio(p["cov"]), {"max_assets": 500}),
+    "min_variance_portfolio[finite_diff]": (lambda p: lambda: _min_variance_finite_diff(p["cov"]), {"max_assets": 500}),
+    "max_sharpe_portfolio": (lambda p: lambda: max_sharpe_portfolio(p["mu"], p["cov"]), {"max_assets": 200}),
+    "compute_efficient_frontier": (lambda p: lambda: compute_efficient_frontier(p["mu"], p["cov"], 20), {"max_assets": 200}),
+    "compute_efficient_frontier[200 points]": (lambda p: lambda: compute_efficient_frontier(p["mu"], p["cov"], 200), {}),
+    "compute_efficient_frontier[slsqp]": (lambda p: lambda: compute_efficient_frontier(p["mu"], p["cov"], 20, method="slsqp"), {"max_assets": 200}),
+    "rolling_backtest[inverse_variance]": (lambda p: lambda: rolling_backtest(_inverse_variance, p["returns"]), {"min_days": 300}),
+    "rolling_backtest[min_variance]": (lambda p: lambda: rolling_backtest(lambda mu, cov: min_variance_portfolio(cov), p["returns"]), {"max_assets": 50, "min_days": 300}),
+    "run_capm": (lambda p: lambda: run_capm(p["prices"], p["benchmark"]), {}),
+    "run_fama_french_stats": (lambda p: lambda: run_fama_french_stats(p["returns"], p["factors"]), {}),
+    "rolling_factor_betas": (lambda p: lambda: rolling_factor_betas(p["returns"], p["factors"], 126), {"min_days": 300}),
+}
+
+
+def _applies(limits: dict, n_assets: int, n_days: int) -> bool:
+    return n_assets <= limits.get("max_assets", np.inf) and n_days >= limits.get("min_days", 0)
+
+
+def measure(fn, repeat: int = 3) -> dict:
+    """
+    Meilleur temps sur repeat exécutions (après un appel de chauffe) et pic mémoire Python/NumPy (tracemalloc)
+    """
+    fn()  #Chauffe (imports paresseux, caches)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    #Exécution séparée : tracemalloc ralentit le code mesuré
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"seconds": min(timings), "peak_mb": peak / 2 ** 20}
+
+
+def run(profile: str = "quick", cases: list = None, repeat: int = 3, seed: int = 0) -> list:
+    sizes = FULL_SIZES if profile == "full" else QUICK_SIZES
+    names = cases or list(CASES)
+    results = []
+
+    for n_assets, n_days in sizes:
+        panel = synthetic_panel(n_assets, n_days, seed)
+        for name in names:
+            factory, limits = CASES[name]
+            if not _applies(limits, n_assets, n_days):
+                continue
+            record = {"name": name, "n_assets": n_assets, "n_days": n_days}
+            record.update(measure(factory(panel), repeat))
+            results.append(record)
+            print(f"{name:<38} {n_assets:>5} x {n_days:<6} {record['seconds']:>10.4f}s {record['peak_mb']:>10.1f} MB")
+
+    return results
+
+
+#### Comparaison à une référence
+
+def _key(record: dict) -> tuple:
+    return record["name"], record["n_assets"], record["n_days"]
+
+
+def compare(results: list, baseline: list, threshold: float = 0.2) -> list:
+    """
+    Cas plus lents que la référence de plus de threshold (0.2 -> +20%)
+
+    Returns:
+        list: (nom, n_assets, n_days, temps référence, temps actuel, ratio)
+    """
+    reference = {_key(r): r for r in baseline}
+    regressions = []
+    for record in results:
+        ref = reference.get(_key(record))
+        if ref is None or ref["seconds"] <= 0:
+            continue
+        ratio = record["seconds"] / ref["seconds"]
+        if ratio > 1 + threshold:
+            regressions.append(_key(record) + (ref["seconds"], record["seconds"], ratio))
+    return regressions
+
+
+def _write_json(path: str, results: list):
+    payload = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2)
+
+
+def _write_csv(path: str, results: list):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["name", "n_assets", "n_days", "seconds", "peak_mb"])
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", choices=["quick", "full"], default="quick")
+    parser.add_argument("--cases", nargs="*", choices=list(CASES), help="Sous-ensemble de cas à exécuter")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Résultats JSON")
+    parser.add_argument("--csv", help="Résultats CSV")
+    parser.add_argument("--baseline", help="Référence JSON à comparer")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Ralentissement toléré (0.2 -> +20%%)")
+    parser.add_argument("--save-baseline", help="Enregistre les résultats comme nouvelle référence")
+    args = parser.parse_args(argv)
+
+    results = run(args.profile, args.cases, args.repeat, args.seed)
+
+    if args.output:
+        _write_json(args.output, results)
+    if args.csv:
+        _write_csv(args.csv, results)
+    if args.save_baseline:
+        _write_json(args.save_baseline, results)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for name, n_assets, n_days, before, after, ratio in regressions:
+            print(f"REGRESSION {name} {n_assets}x{n_days}: {before:.4f}s -> {after:.4f}s (x{ratio:.2f})")
+        if regressions:
+            return 1
+        print(f"Aucune régression au-delà de +{args.threshold:.0%}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
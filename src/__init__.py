@@ -0,0 +1,44 @@
+"""
+Pipeline d'optimisation de portefeuille (CAPM & Fama-French).
+
+Les fonctions sont exposées au niveau du paquet mais les modules ne sont importés qu'au premier accès
+(PEP 562) : `import src` est immédiat, et les dépendances lourdes (scipy.stats, matplotlib, yfinance, joblib)
+ne sont chargées que par les fonctions qui les utilisent.
+
+    from src import max_sharpe_portfolio      # importe seulement portfolio_optimization
+"""
+import importlib
+
+_EXPORTS = {
+    "data_loader": ["get_data_adj", "get_benchmark", "get_ff_factors", "PriceCache", "BatchedSource", "YahooSource", "DataFrameSource"],
+    "risk_metrics": ["compute_returns", "compute_volatility", "compute_sharpe_ratio", "drawdowns", "value_at_risk",
+                     "conditional_value_at_risk", "max_drawdown_duration", "portfolio_metrics", "rolling_metrics", "monte_carlo_risk"],
+    "factor_models": ["run_capm", "expected_returns_capm", "run_fama_french_stats", "rolling_factor_betas"],
+    "covariance": ["RollingCovariance", "ledoit_wolf", "oas", "FactorCovariance", "factor_covariance"],
+    "portfolio_optimization": ["mean_variance_optimization", "max_sharpe_portfolio", "min_variance_portfolio",
+                               "custom_objective_portfolio", "compute_efficient_frontier", "min_cvar_portfolio",
+                               "risk_parity_portfolio", "OptimizationCache"],
+    "backtesting": ["backtest_portfolio", "rolling_backtest", "compare_strategies", "parameter_sweep"],
+    "panel": ["ReturnsPanel"],
+    "reporting": ["downsample", "plot_cumulative_returns", "plot_drawdown", "plot_efficient_frontier", "summary_table",
+                  "ReportBuilder", "export_report_pdf"],
+    "instrumentation": ["Profiler"],
+}
+
+_ORIGIN = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = sorted(_ORIGIN) + sorted(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name in _EXPORTS:
+        return importlib.import_module(f".{name}", __name__)
+    if name in _ORIGIN:
+        value = getattr(importlib.import_module(f".{_ORIGIN[name]}", __name__), name)
+        globals()[name] = value  #Accès suivants sans passer par __getattr__
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(__all__))
@@ -1,6 +1,17 @@
+import os
+import shutil
+import tempfile
+import inspect
+import itertools
+
 import numpy as np
 import pandas as pd
 
+from .covariance import RollingCovariance
+from .panel import ReturnsPanel
+from .risk_metrics import drawdowns, portfolio_metrics
+from .instrumentation import instrumented, span, count
+
 def backtest_portfolio(weights: np.ndarray, returns: pd.DataFrame) -> pd.DataFrame:
     """
     Calcule la performance historique d’un portefeuille à poids fixes.
@@ -13,65 +24,223 @@ def backtest_portfolio(weights: np.ndarray, returns: pd.DataFrame) -> pd.DataFra
         pd.DataFrame: rendements cumulés, volatilité, Sharpe, drawdown
     """
     portfolio_returns = returns @ weights
-    cumulative_returns = (1 + portfolio_returns).cumprod()
-    volatility = portfolio_returns.std() * np.sqrt(252)
-    sharpe = portfolio_returns.mean() / portfolio_returns.std() * np.sqrt(252)
-    drawdown = cumulative_returns / cumulative_returns.cummax() - 1
+    cumulative_returns, drawdown = drawdowns(portfolio_returns)
+    stats = portfolio_metrics(portfolio_returns).iloc[:, 0]
 
     return pd.DataFrame({
         'Cumulative': cumulative_returns,
         'Drawdown': drawdown,
-        'Volatility': volatility,
-        'Sharpe': sharpe
+        'Volatility': stats['Volatility'],
+        'Sharpe': stats['Sharpe Ratio']
     })
 
 
 
-def rolling_backtest(strategy_fn, returns: pd.DataFrame, window_size: int = 252, rebalance_freq: int = 21, transaction_fee: float = 1.0) -> pd.Series:
+def _accepted_kwargs(strategy_fn, names: tuple) -> set:
+    """
+    Arguments optionnels (parmi names) que strategy_fn accepte en plus de (mu, cov)
+    """
+    try:
+        parameters = inspect.signature(strategy_fn).parameters.values()
+    except (TypeError, ValueError):
+        return set()
+    if any(p.kind is inspect.Parameter.VAR_KEYWORD for p in parameters):
+        return set(names)
+    return {p.name for p in parameters} & set(names)
+
+
+
+def _window_frame(returns, start: int, stop: int) -> pd.DataFrame:
+    #ReturnsPanel -> DataFrame autour d'une vue, DataFrame -> iloc
+    return returns.frame(start, stop) if hasattr(returns, "frame") else returns.iloc[start:stop]
+
+
+
+@instrumented()
+def rolling_backtest(strategy_fn, returns: pd.DataFrame, window_size: int = 252, rebalance_freq: int = 21, transaction_fee: float = 1.0, halflife: float = None, cov_estimator=None, cache=None, cost_rate: float = 0.0, initial_capital: float = 10_000.0, no_trade_band: float = 0.0, turnover_penalty: float = 0.0, return_details: bool = False) -> pd.Series:
     """
-    Backtest avec rééquilibrage périodique et frais de transaction fixes.
+    Backtest avec rééquilibrage périodique, dérive des poids entre deux rééquilibrages et frais de transaction.
+    
+    Entre deux rééquilibrages, les positions ne sont pas rééquilibrées : les poids dérivent avec les prix.
+    À chaque date de rééquilibrage (toutes les rebalance_freq séances) :
+        - si les poids ont dérivé de moins de no_trade_band (écart max par actif) par rapport à la dernière cible,
+          ni optimisation ni transaction ;
+        - sinon la stratégie est réoptimisée, et on ne traite que si la nouvelle cible s'écarte des poids courants
+          de plus de no_trade_band.
     
     Args:
         strategy_fn: fonction qui retourne les poids optimaux
-        returns: rendements journaliers
+        returns: rendements journaliers sans NaN (pd.DataFrame ou panel.ReturnsPanel, fenêtres sans copie), ValueError sinon
         window_size: taille de la fenêtre d’estimation
         rebalance_freq: fréquence de rééquilibrage
-        transaction_fee: coût fixe par actif modifié (1eur chez Trade Republic)
+        transaction_fee: coût fixe par actif modifié, en devise (1eur chez Trade Republic)
+        halflife: demi-vie de la pondération exponentielle de mu et cov (None -> poids égaux)
+        cov_estimator: fonction fenêtre (pd.DataFrame) -> covariance (ex: ledoit_wolf, oas,
+            partial(factor_covariance, factors=ff)), None -> covariance empirique glissante
+        cache: OptimizationCache optionnel -> les fenêtres déjà résolues (mêmes mu, cov, stratégie) ne sont pas recalculées
+        cost_rate: coût proportionnel au montant échangé (0.001 -> 10 points de base)
+        initial_capital: capital initial en devise (convertit les frais fixes en fraction du portefeuille)
+        no_trade_band: tolérance de dérive des poids en dessous de laquelle on ne traite pas (0 -> toujours)
+        turnover_penalty: pénalité de rotation transmise aux stratégies qui l'acceptent (avec current_weights)
+        return_details: si True, retourne aussi le détail par date de rééquilibrage
+    
+    Dans un instrumentation.Profiler, chaque date de rééquilibrage produit les étapes backtest.estimate,
+    backtest.optimize et backtest.simulate (détail par date : profiler.breakdown('date')).
+    
+    Si strategy_fn accepte un argument init_weights, les poids du rééquilibrage précédent lui sont passés (warm start) ;
+    s'il accepte scenarios, il reçoit les rendements de la fenêtre (ex: min_cvar_portfolio) ;
+    s'il accepte current_weights / turnover_penalty, il reçoit les poids courants (après dérive) et la pénalité.
     
     Returns:
-        pd.Series: rendements cumulés du portefeuille
+        pd.Series: rendements cumulés du portefeuille, nets de frais (ou (série, pd.DataFrame) si return_details :
+            rotation, frais, nombre de lignes traitées, optimisation et transaction effectuées ou non)
     """
     dates = returns.index
-    cumulative = []
-    weights = None
-    capital = 1.0  #capital initial
-    prev_weights = np.zeros(returns.shape[1])
+    n = returns.shape[1]
+    value = float(initial_capital)  #Valeur du portefeuille en devise
+    target = None  #Dernière cible de la stratégie
+    weights = None  #Dernière solution (warm start)
+    current = np.zeros(n)  #Poids détenus (après dérive), portefeuille initialement en cash
+
+    #Estimation glissante : seules les rebalance_freq lignes entrantes/sortantes sont traitées à chaque pas
+    values = returns.values
+    estimator = None
+
+    #Valeur du portefeuille pour chaque jour après la première fenêtre (pré-allouée)
+    cumulative = np.empty(max(len(returns) - window_size, 0))
+    extra_args = _accepted_kwargs(strategy_fn, ("init_weights", "scenarios", "current_weights", "turnover_penalty"))
+    details = []
+    checked = 0  #Lignes déjà contrôlées (NaN)
 
     for i in range(window_size, len(returns), rebalance_freq):
-        window = returns.iloc[i - window_size:i]
-        cov = window.cov().values
-        mu = window.mean().values
-        weights = strategy_fn(mu, cov)
+        date = dates[i]
+        #Fenêtre d'estimation et période suivante sans NaN, contrôlées au fur et à mesure (pas de copie du panel)
+        stop = min(i + rebalance_freq, len(returns))
+        if np.isnan(values[checked:stop]).any():
+            raise ValueError(f"rolling_backtest : rendements NaN avant le {dates[stop - 1]} (titres non cotés ?), "
+                             "restreindre la période ou les tickers, ou remplir les NaN.")
+        checked = stop
+        initial = target is None  #Premier investissement : toujours exécuté
+        optimize = initial or np.max(np.abs(current - target)) > no_trade_band
+
+        with span('backtest.estimate', date=date):
+            #Estimateur glissant mis à jour à chaque pas, même sans réoptimisation
+            if cov_estimator is None:
+                if estimator is None or rebalance_freq >= window_size:
+                    estimator = RollingCovariance(values[i - window_size:i], halflife)
+                else:
+                    estimator.update(values[i - rebalance_freq:i], values[i - rebalance_freq - window_size:i - window_size])
+            if optimize:
+                if cov_estimator is not None:
+                    cov = cov_estimator(_window_frame(returns, i - window_size, i))
+                    mu = values[i - window_size:i].mean(axis=0, dtype=float)
+                else:
+                    cov = estimator.cov
+                    mu = estimator.mean
+
+        if optimize:
+            kwargs = {}
+            if "init_weights" in extra_args and weights is not None:
+                kwargs['init_weights'] = weights
+            if "scenarios" in extra_args:
+                kwargs['scenarios'] = values[i - window_size:i]
+            if turnover_penalty and "current_weights" in extra_args and not initial:
+                kwargs['current_weights'] = current
+                if "turnover_penalty" in extra_args:
+                    kwargs['turnover_penalty'] = turnover_penalty
+            with span('backtest.optimize', date=date):
+                if cache is not None:
+                    weights = cache.solve(strategy_fn, mu, cov, **kwargs)
+                else:
+                    weights = strategy_fn(mu, cov, **kwargs)
+            target = np.asarray(weights, dtype=float)
+            count('backtest.optimizations')
 
-        # Calcul des frais de transaction
-        changed_positions = np.abs(weights - prev_weights) > 1e-4
-        fee_total = transaction_fee * np.sum(changed_positions)
-        capital -= fee_total / capital  #ajustement du capital
+        with span('backtest.simulate', date=date):
+            #Transaction seulement si la cible s'écarte des poids courants de plus de la bande
+            trade = target - current
+            rebalance = initial or (optimize and np.max(np.abs(trade)) > no_trade_band)
+            turnover, cost, n_trades = 0.0, 0.0, 0
+            if rebalance:
+                turnover = np.abs(trade).sum()
+                n_trades = int(np.sum(np.abs(trade) > 1e-4))
+                #Frais proportionnels + frais fixes (devise -> fraction de la valeur du portefeuille)
+                cost = min(cost_rate * turnover + transaction_fee * n_trades / value, 1.0)  #Frais > valeur -> ruine
+                value *= 1 - cost
+                current = target.copy()
+                count('backtest.trades', n_trades)
 
-        # Application des rendements
-        step_returns = returns.iloc[i:i + rebalance_freq] @ weights
-        for r in step_returns:
-            capital *= (1 + r)
-            cumulative.append(capital)
+            if return_details:
+                details.append((date, turnover, cost, n_trades, optimize, rebalance))
 
-        prev_weights = weights.copy()
+            #Buy and hold jusqu'au prochain rééquilibrage : croissance de chaque ligne, puis dérive des poids
+            growth = np.cumprod(1 + values[i:i + rebalance_freq], axis=0, dtype=float)
+            path = growth @ current
+            cumulative[i - window_size:i - window_size + len(path)] = value / initial_capital * path
+            value *= path[-1]
+            if value <= 0:
+                cumulative[i - window_size + len(path):] = 0.0
+                break
+            current = current * growth[-1] / path[-1]
 
     cumulative = pd.Series(cumulative, index=dates[window_size:window_size + len(cumulative)])
-    return cumulative
+    if not return_details:
+        return cumulative
+    details = pd.DataFrame(details, columns=['Date', 'Turnover', 'Cost', 'Trades', 'Optimized', 'Rebalanced']).set_index('Date')
+    return cumulative, details
+
+
+
+def _run_backtest(strategy_fn, values: np.ndarray, dates, tickers, window_size: int, rebalance_freq: int, transaction_fee: float) -> pd.Series:
+    """
+    Exécuté dans un worker : reconstruit un ReturnsPanel autour de la matrice partagée (sans copie)
+    """
+    returns = ReturnsPanel(values, dates, tickers)
+    return rolling_backtest(strategy_fn, returns, window_size, rebalance_freq, transaction_fee)
 
 
+def _run_backtests(tasks: list, returns: pd.DataFrame, n_jobs: int = 1) -> list:
+    """
+    Lance une liste de backtests (strategy_fn, window_size, rebalance_freq, transaction_fee)
+    
+    Avec n_jobs != 1, la matrice des rendements est écrite une seule fois dans un fichier mappé en mémoire
+    (/dev/shm si disponible) et les workers y accèdent par référence au lieu de recevoir une copie par tâche.
+    Un ReturnsPanel déjà mappé depuis le disque (ReturnsPanel.open) est partagé directement, sans écriture.
+    
+    Returns:
+        list: rendements cumulés, dans l'ordre des tâches (même index que returns, quel que soit n_jobs)
+    """
+    if n_jobs == 1:
+        return [rolling_backtest(fn, returns, w, f, fee) for fn, w, f, fee in tasks]
+
+    from joblib import Parallel, delayed  #loky + cloudpickle -> les lambdas sont acceptées comme stratégies
 
-def compare_strategies(strategy_dict: dict, returns: pd.DataFrame, window_size: int = 252, rebalance_freq: int = 21) -> pd.DataFrame:
+    #Dates positionnelles dans les workers, l'index d'origine (fuseau, heures, RangeIndex...) est remis ensuite
+    dates = np.arange(len(returns)).astype('M8[D]')
+    tickers = np.asarray(returns.columns, dtype=str)
+    tmp_dir = tempfile.mkdtemp(prefix="backtest_", dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+    try:
+        values = returns.values
+        if not isinstance(values, np.memmap):
+            path = os.path.join(tmp_dir, "returns.npy")
+            np.save(path, np.ascontiguousarray(values, dtype=values.dtype if values.dtype.kind == 'f' else float))
+            values = np.load(path, mmap_mode="r")  #np.memmap -> transmis aux workers par nom de fichier
+
+        results = Parallel(n_jobs=n_jobs)(
+            delayed(_run_backtest)(fn, values, dates, tickers, w, f, fee)
+            for fn, w, f, fee in tasks
+        )
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    for result, (_, w, _, _) in zip(results, tasks):
+        result.index = returns.index[w:w + len(result)]
+    return results
+
+
+
+@instrumented()
+def compare_strategies(strategy_dict: dict, returns: pd.DataFrame, window_size: int = 252, rebalance_freq: int = 21, n_jobs: int = 1) -> pd.DataFrame:
     """
     Compare plusieurs stratégies de portefeuille
     
@@ -80,12 +249,37 @@ def compare_strategies(strategy_dict: dict, returns: pd.DataFrame, window_size:
         returns: rendements journaliers
         window_size: taille de la fenêtre
         rebalance_freq: fréquence de rééquilibrage
+        n_jobs: nombre de processus (1 -> séquentiel, -1 -> tous les coeurs)
     
     Returns:
         pd.DataFrame: rendements cumulés par stratégie
     """
-    results = {}
-    for name, strategy_fn in strategy_dict.items():
-        results[name] = rolling_backtest(strategy_fn, returns, window_size, rebalance_freq)
+    tasks = [(strategy_fn, window_size, rebalance_freq, 1.0) for strategy_fn in strategy_dict.values()]
+    results = _run_backtests(tasks, returns, n_jobs)
+
+    return pd.DataFrame(dict(zip(strategy_dict.keys(), results)))
+
+
+
+@instrumented()
+def parameter_sweep(strategy_dict: dict, returns: pd.DataFrame, window_sizes: list = (252,), rebalance_freqs: list = (21,), transaction_fees: list = (1.0,), n_jobs: int = -1) -> pd.DataFrame:
+    """
+    Grille stratégies x window_size x rebalance_freq x frais, exécutée en parallèle
+    
+    Args:
+        strategy_dict: dictionnaire {nom: fonction_stratégie}
+        returns: rendements journaliers
+        window_sizes: tailles de fenêtre à tester
+        rebalance_freqs: fréquences de rééquilibrage à tester
+        transaction_fees: frais de transaction à tester
+        n_jobs: nombre de processus (1 -> séquentiel, -1 -> tous les coeurs)
+    
+    Returns:
+        pd.DataFrame: rendements cumulés, colonnes (strategy, window_size, rebalance_freq, transaction_fee)
+    """
+    keys = list(itertools.product(strategy_dict.keys(), window_sizes, rebalance_freqs, transaction_fees))
+    tasks = [(strategy_dict[name], w, f, fee) for name, w, f, fee in keys]
+    results = _run_backtests(tasks, returns, n_jobs)
 
-    return pd.DataFrame(results)
+    columns = pd.MultiIndex.from_tuples(keys, names=["strategy", "window_size", "rebalance_freq", "transaction_fee"])
+    return pd.concat(results, axis=1, keys=columns)
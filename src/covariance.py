@@ -0,0 +1,199 @@
+import numpy as np
+import pandas as pd
+
+from .factor_models import _batched_ols
+from .instrumentation import instrumented
+
+
+class RollingCovariance:
+    """
+    Estimateur glissant de la moyenne et de la covariance sur une fenêtre de taille fixe.
+
+    Au lieu de recalculer window.cov() à chaque rééquilibrage, on conserve les sommes pondérées
+    des rendements et de leurs produits croisés, puis on ajoute les nouvelles lignes et retire les
+    anciennes (mises à jour de rang k) -> coût O(k·n²) par pas au lieu de O(window·n²).
+
+    Les sommes sont calculées sur les données décalées par la moyenne de la première fenêtre
+    (algorithme "shifted data"), ce qui évite l'annulation numérique de la formule E[x²] - E[x]².
+
+    Args:
+        window: première fenêtre de rendements (window_size x n), sans NaN (ValueError sinon, ici comme dans update)
+        halflife: demi-vie (en jours) de la pondération exponentielle, None -> poids égaux
+    """
+
+    def __init__(self, window: np.ndarray, halflife: float = None):
+        window = np.asarray(window)  #Pas de copie float64 d'une vue float32 (ReturnsPanel) : conversion dans window - shift
+        if np.isnan(window).any():
+            raise ValueError("RollingCovariance : la fenêtre contient des NaN (les sommes glissantes resteraient NaN).")
+        self.window_size = window.shape[0]
+        self.decay = 1.0 if halflife is None else 0.5 ** (1.0 / halflife)
+        self.shift = window.mean(axis=0, dtype=float)
+
+        #Poids par âge (0 = observation la plus récente)
+        ages = np.arange(self.window_size - 1, -1, -1)
+        weights = self.decay ** ages
+        self.sum_weights = weights.sum()
+        self.sum_weights_sq = (weights ** 2).sum()
+
+        centered = window - self.shift
+        self.sum_x = weights @ centered
+        self.sum_xx = centered.T @ (weights[:, None] * centered)
+
+    def update(self, new_rows: np.ndarray, old_rows: np.ndarray):
+        """
+        Fait glisser la fenêtre de k lignes
+
+        Args:
+            new_rows: k nouvelles observations (les plus anciennes en premier)
+            old_rows: les k observations qui sortent de la fenêtre (les plus anciennes en premier)
+        """
+        #Les lignes sortantes ont déjà été contrôlées à leur entrée dans la fenêtre
+        if np.isnan(new_rows).any():
+            raise ValueError("RollingCovariance : les nouvelles lignes contiennent des NaN (les sommes glissantes resteraient NaN).")
+        new_rows = np.asarray(new_rows) - self.shift
+        old_rows = np.asarray(old_rows) - self.shift
+        k = new_rows.shape[0]
+        if k == 0:
+            return
+        if k >= self.window_size:
+            raise ValueError("Le pas doit être inférieur à la taille de la fenêtre, recréer l'estimateur.")
+
+        #Poids des entrées (âges k-1..0) et des sorties (âges window_size..window_size+k-1 après décalage)
+        steps = np.arange(k - 1, -1, -1)
+        w_in = self.decay ** steps
+        w_out = self.decay ** (steps + self.window_size)
+
+        aged = self.decay ** k
+        self.sum_x = aged * self.sum_x + w_in @ new_rows - w_out @ old_rows
+        self.sum_xx = (aged * self.sum_xx
+                       + new_rows.T @ (w_in[:, None] * new_rows)
+                       - old_rows.T @ (w_out[:, None] * old_rows))
+
+    @property
+    def mean(self) -> np.ndarray:
+        """Moyenne (pondérée) de la fenêtre courante"""
+        return self.shift + self.sum_x / self.sum_weights
+
+    @property
+    def cov(self) -> np.ndarray:
+        """Covariance (pondérée, non biaisée) de la fenêtre courante -> égale à window.cov() si halflife=None"""
+        centered_mean = self.sum_x / self.sum_weights
+        scatter = self.sum_xx - self.sum_weights * np.outer(centered_mean, centered_mean)
+        cov = scatter / (self.sum_weights - self.sum_weights_sq / self.sum_weights)
+        return (cov + cov.T) / 2  #Symétrie exacte malgré les arrondis
+
+
+#### Estimateurs par shrinkage (univers larges : plus d'actifs que de jours)
+
+def _empirical_cov(returns) -> tuple:
+    X = np.asarray(returns)
+    X = X - X.mean(axis=0, dtype=float)  #Une seule copie float64, même pour un panel float32
+    return X, X.T @ X / X.shape[0]
+
+
+@instrumented()
+def ledoit_wolf(returns) -> np.ndarray:
+    """
+    Covariance de Ledoit-Wolf : shrinkage de la covariance empirique vers mu·I (mu = variance moyenne),
+    intensité optimale estimée à partir des données. Toujours définie positive.
+    
+    Args:
+        returns: rendements (jours x actifs), sans NaN
+    
+    Returns:
+        np.ndarray: covariance (n x n)
+    """
+    X, S = _empirical_cov(returns)
+    T, n = X.shape
+    mu = np.trace(S) / n
+
+    delta = ((S - mu * np.eye(n)) ** 2).sum() / n
+    X2 = X ** 2
+    beta = ((X2.T @ X2).sum() / T - (S ** 2).sum()) / (n * T)
+    shrinkage = 0.0 if delta == 0 else min(beta, delta) / delta
+
+    return (1 - shrinkage) * S + shrinkage * mu * np.eye(n)
+
+
+@instrumented()
+def oas(returns) -> np.ndarray:
+    """
+    Covariance OAS (Oracle Approximating Shrinkage), même cible que Ledoit-Wolf, meilleure pour les petits échantillons
+    
+    Args:
+        returns: rendements (jours x actifs), sans NaN
+    
+    Returns:
+        np.ndarray: covariance (n x n)
+    """
+    X, S = _empirical_cov(returns)
+    T, n = X.shape
+    mu = np.trace(S) / n
+
+    alpha = (S ** 2).mean()
+    denominator = (T + 1) * (alpha - mu ** 2 / n)
+    shrinkage = 1.0 if denominator == 0 else min((alpha + mu ** 2) / denominator, 1.0)
+
+    return (1 - shrinkage) * S + shrinkage * mu * np.eye(n)
+
+
+#### Covariance factorielle (rang faible + diagonale)
+
+class FactorCovariance:
+    """
+    Covariance structurée par facteurs : B·F·B' + diag(D), sans jamais former la matrice n x n.
+
+    cov @ w et w @ cov coûtent O(n·k) au lieu de O(n²) : l'objet s'utilise à la place d'une matrice dense
+    dans les optimiseurs de portfolio_optimization et comme sortie de cov_estimator dans rolling_backtest.
+
+    Args:
+        loadings: betas B (n x k)
+        factor_cov: covariance des facteurs F (k x k)
+        specific_var: variances spécifiques D (n)
+    """
+
+    __array_ufunc__ = None  #w @ cov avec w np.ndarray -> délègue à __rmatmul__
+
+    def __init__(self, loadings: np.ndarray, factor_cov: np.ndarray, specific_var: np.ndarray):
+        self.loadings = np.asarray(loadings, dtype=float)
+        self.factor_cov = np.asarray(factor_cov, dtype=float)
+        self.specific_var = np.asarray(specific_var, dtype=float)
+        n = self.loadings.shape[0]
+        self.shape = (n, n)
+
+    def __matmul__(self, w):
+        w = np.asarray(w, dtype=float)
+        specific = self.specific_var.reshape((-1,) + (1,) * (w.ndim - 1))
+        return self.loadings @ (self.factor_cov @ (self.loadings.T @ w)) + specific * w
+
+    def __rmatmul__(self, w):
+        #Matrice symétrique : w @ cov = (cov @ w')'
+        w = np.asarray(w, dtype=float)
+        return (self @ w.T).T
+
+    def diagonal(self) -> np.ndarray:
+        return np.einsum('ik,kl,il->i', self.loadings, self.factor_cov, self.loadings) + self.specific_var
+
+    def to_dense(self) -> np.ndarray:
+        return self.loadings @ self.factor_cov @ self.loadings.T + np.diag(self.specific_var)
+
+
+@instrumented()
+def factor_covariance(returns: pd.DataFrame, factors: pd.DataFrame) -> FactorCovariance:
+    """
+    Covariance factorielle à partir des betas de la régression multi-actifs (CAPM, Fama-French...)
+    
+    Args:
+        returns (pd.DataFrame): Rendements des actifs
+        factors (pd.DataFrame): Facteurs (ex: ['MKT', 'SMB', 'HML']), alignés sur les dates de returns
+    
+    Returns:
+        FactorCovariance: B·F·B' + diag(variances résiduelles)
+    """
+    factors = factors.reindex(returns.index).dropna()
+    Y = returns.loc[factors.index].values.astype(float)
+    X = np.column_stack([np.ones(len(factors)), factors.values])
+    fit = _batched_ols(X, Y)
+
+    return FactorCovariance(fit['params'][1:].T, np.atleast_2d(np.cov(factors.values, rowvar=False)), fit['resid_var'])
+
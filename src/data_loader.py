@@ -1,20 +1,39 @@
+import os
+import json
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import pandas as pd
-import yfinance as yf  #API non officiel -> evite de devoir faire un scrapper
+
+from .instrumentation import instrumented, span, count, enabled
+
+logger = logging.getLogger(__name__)
 
     
-def get_data_adj(tickers, start, end, save_to_csv=False):  #Je def source au cas ou pour alternatives Quandl ou Alpha Vantage
+@instrumented()
+def get_data_adj(tickers, start, end, save_to_csv=False, cache=None, source=None):  #Je def source au cas ou pour alternatives Quandl ou Alpha Vantage
     """
     Télécharge les prix ajustés depuis Yahoo Finance
     Args:
-        tickers (list): Liste des symboles
+        tickers (list | str): Liste des symboles (ou un seul symbole)
         start (str): Date de début (format 'YYYY-MM-DD')
         end (str): Date de fin (format 'YYYY-MM-DD')
         save_to_csv (bool): Si True, sauvegarde les données dans un fichier CSV
+        cache (PriceCache): Si fourni, lit les prix depuis le cache local (seules les plages manquantes sont téléchargées)
+        source: Source des prix si pas de cache (par défaut BatchedSource -> Yahoo par lots en parallèle)
     Returns:
         pd.DataFrame: Prix ajustés
     """
+    tickers = [tickers] if isinstance(tickers, str) else list(tickers)
     try:
-        data = yf.download(tickers, start=start, end=end, auto_adjust=False)["Adj Close"] #Adj pour obtenir prix après cloture -> prendre en compte les fractionnements + dividendes 
+        if cache is not None:
+            data = cache.get(tickers, start, end)
+        else:
+            source = source if source is not None else BatchedSource()
+            data = source.fetch(tickers, start, end)
         if data.empty:
             raise ValueError("No data was downloaded, please verify tickers or time")
         
@@ -23,20 +42,20 @@ def get_data_adj(tickers, start, end, save_to_csv=False):  #Je def source au cas
         
         missing = [ticker for ticker in tickers if ticker not in data.columns]
         if missing:
-            print(f"Data missing for : {missing}")
+            logger.warning("Data missing for : %s", missing)
                 
         if save_to_csv:
             filename = f"data_adj_{start}_{end}.csv"
             data.to_csv(filename)
-            print(f"Data saved in {filename}")
+            logger.info("Data saved in %s", filename)
 
         return data
     except Exception as e:
-        print(f"Error while downloading data : {e}")
+        logger.error("Error while downloading data : %s", e)
         return pd.DataFrame()
 
 
-def get_benchmark(ticker="^GSPC", start=None, end=None) -> pd.Series:
+def get_benchmark(ticker="^GSPC", start=None, end=None, cache=None) -> pd.Series:
     """
     Télécharge les prix ajustés du benchmark (ex: S&P500) via yfinance.
 
@@ -44,13 +63,21 @@ def get_benchmark(ticker="^GSPC", start=None, end=None) -> pd.Series:
         ticker (str): Ticker Yahoo Finance du benchmark (par défaut ^GSPC)
         start (str): Date de début au format 'YYYY-MM-DD'
         end (str): Date de fin au format 'YYYY-MM-DD'
+        cache (PriceCache): Si fourni, lit les prix depuis le cache local
 
     Returns:
         pd.Series: Série des prix ajustés du benchmark
     """
     try:
-        data = yf.download(ticker, start=start, end=end, auto_adjust=True)
-        benchmark = data["Close"].dropna()
+        if cache is not None:
+            benchmark = cache.get([ticker], start, end)[ticker].dropna()
+        else:
+            import yfinance as yf  #Import paresseux (seul le téléchargement en a besoin)
+            with span('data.yf_download', tickers=1):
+                data = yf.download(ticker, start=start, end=end, auto_adjust=True)
+            if enabled():
+                count('data.bytes_downloaded', np.sum(data.memory_usage()))  #int pour une Series, par colonne pour un DataFrame
+            benchmark = data["Close"].dropna()
 
         if benchmark.empty:
             raise ValueError("Aucune donnée téléchargée. Vérifiez le ticker ou la période.")
@@ -64,45 +91,395 @@ def get_benchmark(ticker="^GSPC", start=None, end=None) -> pd.Series:
 
 import pandas as pd
 
-def get_ff_factors(start, end, frequency='monthly'):
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")  #Indépendant du dossier courant
+
+#Fichiers candidats par fréquence (le premier existant est utilisé)
+FF_FILES = {
+    'monthly': ['FF_Data_Month.csv', 'F-F_Research_Data_Factors.csv'],
+    'annual': ['FF_Data_Year.csv', 'F-F_Research_Data_Factors.csv'],
+    'daily': ['F-F_Research_Data_Factors_daily.csv', 'F-F_Research_Data_Factors_daily.CSV'],
+}
+
+_FF_DATE_FORMATS = {'annual': (4, '%Y'), 'monthly': (6, '%Y%m'), 'daily': (8, '%Y%m%d')}
+_FF_MEMO = {}  #(chemin, fréquence) -> (mtime, dates, valeurs)
+
+
+def _parse_ff_csv(path, frequency):
+    """
+    Lit un fichier Fama-French (brut ou fichier complet du site avec en-têtes et sections mensuelle/annuelle)
+    et garde les lignes dont la date a le format de la fréquence demandée.
+    
+    Returns:
+        (np.ndarray, np.ndarray): dates (datetime64[D]) et valeurs décimales (Mkt-RF, SMB, HML, RF)
+    """
+    width, date_format = _FF_DATE_FORMATS[frequency]
+    dates, values = [], []
+    with open(path) as f:
+        for line in f:
+            fields = line.strip().split(',')
+            if len(fields) < 5 or len(fields[0].strip()) != width or not fields[0].strip().isdigit():
+                continue  #En-têtes, lignes vides, copyright, autres sections
+            dates.append(fields[0].strip())
+            values.append([float(x) for x in fields[1:5]])
+
+    dates = pd.to_datetime(pd.Series(dates, dtype=str), format=date_format).values.astype('M8[D]')
+    values = np.array(values, dtype=float).reshape(-1, 4) / 100  #Les facteurs sont donnés en pourcentages
+    return dates, values
+
+
+def _load_ff(path, frequency):
+    """
+    Facteurs parsés une seule fois : mémo en mémoire, puis fichier binaire .npz dans data/cache
+    invalidé si le CSV a été modifié (mtime)
+    """
+    mtime = os.path.getmtime(path)
+    key = (os.path.abspath(path), frequency)
+    if key in _FF_MEMO and _FF_MEMO[key][0] == mtime:
+        return _FF_MEMO[key][1:]
+
+    sidecar = os.path.join(DATA_DIR, "cache", f"ff_{os.path.basename(path)}_{frequency}.npz")
+    dates = values = None
+    if os.path.exists(sidecar):
+        with np.load(sidecar) as stored:
+            if stored["mtime"] == mtime and stored["source"] == key[0]:
+                dates, values = stored["dates"], stored["values"]
+
+    if dates is None:
+        dates, values = _parse_ff_csv(path, frequency)
+        try:
+            os.makedirs(os.path.dirname(sidecar), exist_ok=True)
+            np.savez(sidecar, dates=dates, values=values, mtime=mtime, source=key[0])
+        except OSError as e:
+            logger.debug("Cache Fama-French non écrit (%s) : %s", sidecar, e)
+
+    count('data.bytes_read', dates.nbytes + values.nbytes)
+    _FF_MEMO[key] = (mtime, dates, values)
+    return dates, values
+
+
+@instrumented()
+def get_ff_factors(start, end, frequency='monthly', path=None):
     """
-    Télécharge et lit les facteurs Fama-French à partir des fichiers CSV (mensuel ou annuel).
+    Lit les facteurs Fama-French à partir des fichiers CSV (journalier, mensuel ou annuel).
     
     Args:
         start (str): Date de début au format 'YYYY-MM-DD'
         end (str): Date de fin au format 'YYYY-MM-DD'
-        frequency (str): 'monthly' ou 'annual' pour spécifier la fréquence des données.
+        frequency (str): 'daily', 'monthly' ou 'annual' pour spécifier la fréquence des données.
+        path (str): Fichier CSV à utiliser (par défaut le premier fichier de FF_FILES présent dans data/)
         
     Returns:
         factors (pd.DataFrame): DataFrame avec les facteurs MKT, SMB, HML
     """
     try:
         # Choisir le fichier CSV en fonction de la fréquence
-        if frequency == 'monthly':
-            factors = pd.read_csv('../data/FF_Data_Month.csv', header=None, names=["Date", "Mkt-RF", "SMB", "HML", "RF"])
-        elif frequency == 'annual':
-            factors = pd.read_csv('../data/FF_Data_Year.csv', header=None, names=["Date", "Mkt-RF", "SMB", "HML", "RF"])
+        if frequency not in FF_FILES:
+            raise ValueError("La fréquence doit être 'daily', 'monthly' ou 'annual'.")
+        if path is None:
+            candidates = [os.path.join(DATA_DIR, name) for name in FF_FILES[frequency]]
+            path = next((c for c in candidates if os.path.exists(c)), candidates[0])
+
+        dates, values = _load_ff(path, frequency)
+
+        # Filtrer les données entre start et end (bornes incluses), dates triées -> searchsorted
+        lo = np.searchsorted(dates, np.datetime64(pd.Timestamp(start).date()), side='left')
+        hi = np.searchsorted(dates, np.datetime64(pd.Timestamp(end).date()), side='right')
+
+        # Garder seulement les facteurs, renommés pour correspondre à Fama-French
+        return pd.DataFrame(values[lo:hi, :3], index=pd.DatetimeIndex(dates[lo:hi].astype('M8[ns]'), name='Date'), columns=['MKT', 'SMB', 'HML'])
+
+    except Exception as e:
+        print(f"Erreur lors du téléchargement des facteurs Fama-French : {e}")
+        return pd.DataFrame()
+
+
+#### Cache local des prix
+
+def _naive_days(prices: pd.Series) -> pd.Series:
+    #Index en heure de la place de cotation -> dates sans fuseau (comme yf.download)
+    index = prices.index
+    if getattr(index, "tz", None) is not None:
+        index = index.tz_localize(None)
+    return prices.set_axis(index.normalize())
+
+
+class YahooSource:
+    """
+    Source de prix Yahoo Finance. Toute source doit exposer fetch(tickers, start, end) -> pd.DataFrame
+    (index de dates, une colonne de prix ajustés par ticker, end exclu).
+
+    yfinance ne lève pas d'erreur quand un ticker échoue (il journalise et renvoie un tableau vide) : ici un ticker
+    sans prix lève une exception, pour que BatchedSource relance le lot et l'enregistre dans failures.
+    Seul un ticker que Yahoo déclare sans cotation sur la plage (YFPricesMissingError) donne une colonne vide.
+    """
+
+    def fetch(self, tickers, start, end) -> pd.DataFrame:
+        import yfinance as yf  #API non officiel -> evite de devoir faire un scrapper
+        from yfinance.exceptions import YFPricesMissingError
+        #Une requête Ticker.history par ticker (yf.download fait de même) : yf.download réinitialise à chaque appel
+        #un état global du module (shared._DFS, shared._ERRORS) que se disputeraient les threads de BatchedSource
+        prices, errors = {}, {}
+        with span('data.yf_download', tickers=len(tickers)):
+            for ticker in tickers:
+                try:
+                    #Adj pour obtenir prix après cloture -> prendre en compte les fractionnements + dividendes
+                    history = yf.Ticker(ticker).history(start=start, end=end, auto_adjust=False, actions=False, raise_errors=True)
+                except YFPricesMissingError:
+                    prices[ticker] = pd.Series(dtype=float)  #Aucune séance sur la plage (réponse explicite de Yahoo)
+                    continue
+                except Exception as e:
+                    errors[ticker] = str(e) or type(e).__name__
+                    continue
+                if "Adj Close" not in history.columns or history["Adj Close"].isna().all():
+                    errors[ticker] = "aucun prix renvoyé"
+                    continue
+                prices[ticker] = _naive_days(history["Adj Close"])
+        if errors:
+            raise ValueError("; ".join(f"{ticker}: {error}" for ticker, error in errors.items()))
+        data = pd.DataFrame(prices)
+        if enabled():
+            count('data.bytes_downloaded', data.memory_usage().sum())
+        return data
+
+
+class DataFrameSource:
+    """
+    Source hors-ligne servant un DataFrame de prix déjà chargé (CSV exporté par get_data_adj, tests...)
+    """
+
+    def __init__(self, prices: pd.DataFrame):
+        self.prices = prices.sort_index()
+
+    def fetch(self, tickers, start, end) -> pd.DataFrame:
+        index = self.prices.index
+        columns = [ticker for ticker in tickers if ticker in self.prices.columns]
+        return self.prices.loc[(index >= start) & (index < end), columns]
+
+
+class BatchedSource:
+    """
+    Couche de téléchargement par lots : découpe les tickers en paquets de chunk_size, les télécharge en parallèle
+    (au plus max_workers requêtes simultanées, espacées d'au moins min_interval secondes), et relance un lot
+    en échec avec un backoff exponentiel.
+
+    Un lot toujours en échec après retries tentatives est relancé ticker par ticker ; les tickers encore en échec
+    n'interrompent pas le chargement : ils sont enregistrés dans self.failures ({ticker: erreur}) et signalés via logging.
+
+    Args:
+        source: Source sous-jacente (par défaut YahooSource)
+        chunk_size (int): Nombre de tickers par lot (un appel à source.fetch)
+        max_workers (int): Nombre de requêtes simultanées
+        retries (int): Nombre de nouvelles tentatives par lot
+        backoff (float): Attente (s) avant la première nouvelle tentative, doublée ensuite
+        min_interval (float): Délai minimal (s) entre deux requêtes, tous threads confondus
+    """
+
+    def __init__(self, source=None, chunk_size=50, max_workers=4, retries=3, backoff=1.0, min_interval=0.0):
+        self.source = source if source is not None else YahooSource()
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.min_interval = min_interval
+        self.failures = {}
+        self._lock = threading.Lock()
+        self._next_request = 0.0
+
+    def _wait_turn(self):
+        #Limitation du débit : chaque requête réserve le créneau suivant
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_request - now
+            self._next_request = max(now, self._next_request) + self.min_interval
+        if wait > 0:
+            time.sleep(wait)
+
+    def _fetch_chunk(self, chunk, start, end):
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            self._wait_turn()
+            try:
+                return self.source.fetch(chunk, start, end), {}
+            except Exception as e:
+                error = e
+                logger.debug("Lot %s, tentative %d en échec : %s", chunk, attempt + 1, e)
+                count('data.download_errors')
+
+        if len(chunk) > 1:
+            #Isoler le(s) ticker(s) fautif(s) : nouvelle passe ticker par ticker
+            results = [self._fetch_chunk([ticker], start, end) for ticker in chunk]
+            frames = [data for data, _ in results if data is not None]
+            failures = {ticker: err for _, errors in results for ticker, err in errors.items()}
+            return (pd.concat(frames, axis=1) if frames else None), failures
+        return None, {ticker: repr(error) for ticker in chunk}
+
+    def fetch(self, tickers, start, end) -> pd.DataFrame:
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        chunks = [tickers[i:i + self.chunk_size] for i in range(0, len(tickers), self.chunk_size)]
+
+        frames = []
+        self.failures = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for data, failures in pool.map(lambda chunk: self._fetch_chunk(chunk, start, end), chunks):
+                if data is not None:
+                    frames.append(data)
+                self.failures.update(failures)
+
+        for ticker, error in self.failures.items():
+            logger.warning("Echec du téléchargement de %s : %s", ticker, error)
+
+        if not frames:
+            return pd.DataFrame()
+        data = pd.concat(frames, axis=1)
+        return data[[ticker for ticker in tickers if ticker in data.columns]]
+
+
+_RECORD = np.dtype([("date", "M8[D]"), ("price", "f8")])
+
+
+def _as_day(date, default) -> str:
+    return pd.Timestamp(default if date is None else date).strftime("%Y-%m-%d")
+
+
+class PriceCache:
+    """
+    Cache local des prix ajustés, un fichier .npy (dates, prix) par ticker lu en mémoire mappée.
+
+    Un index JSON conserve pour chaque ticker la plage [début, fin) déjà demandée à la source :
+    une lecture ne télécharge que les plages manquantes en tête ou en queue. Une plage n'est couverte que si
+    la source a répondu pour le ticker (colonne de prix, vide si la source déclare n'avoir aucune cotation) ;
+    un ticker absent de la réponse ou en échec sera redemandé au prochain appel.
+
+    Args:
+        cache_dir (str): Dossier du cache (par défaut data/cache du dépôt, quel que soit le dossier courant)
+        source: Source des prix (par défaut BatchedSource)
+    """
+
+    def __init__(self, cache_dir=os.path.join(DATA_DIR, "cache"), source=None):
+        self.cache_dir = cache_dir
+        self.source = source if source is not None else BatchedSource()
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self._index_path = os.path.join(cache_dir, "index.json")
+        if os.path.exists(self._index_path):
+            with open(self._index_path) as f:
+                self._index = json.load(f)
         else:
-            raise ValueError("La fréquence doit être 'monthly' ou 'annual'.")
-        
-        # Convertir la colonne 'Date' (au format YYYYMM) en format datetime (YYYY-MM-DD), avec le jour par défaut (01)
-        factors['Date'] = pd.to_datetime(factors['Date'].astype(str) + '01', format='%Y%m%d')
+            self._index = {}
+        self._records = {}  #memmaps déjà ouverts (l'en-tête .npy n'est lu qu'une fois par ticker)
 
-        # Définir la colonne 'Date' comme index
-        factors.set_index('Date', inplace=True)
+    def _path(self, ticker) -> str:
+        return os.path.join(self.cache_dir, ticker.replace("/", "_") + ".npy")
 
-        # Filtrer les données entre start et end
-        factors = factors[(factors.index >= start) & (factors.index <= end)]
+    def _load(self, ticker) -> np.ndarray:
+        if ticker not in self._records:
+            path = self._path(ticker)
+            if not os.path.exists(path):
+                return np.empty(0, dtype=_RECORD)
+            self._records[ticker] = np.load(path, mmap_mode="r")
+        return self._records[ticker]
 
-        # Convertir les valeurs en décimales (les facteurs sont donnés en pourcentages)
-        factors[['Mkt-RF', 'SMB', 'HML']] = factors[['Mkt-RF', 'SMB', 'HML']] / 100
+    def _final_dates(self, ticker, records: np.ndarray) -> np.ndarray:
+        #Séances en cache antérieures à la fin de couverture : définitives (la séance du jour n'est jamais couverte)
+        dates = records["date"]
+        return dates[dates < np.datetime64(self._index[ticker][1])]
 
-        # Renommer les colonnes pour correspondre à Fama-French
-        factors = factors[['Mkt-RF', 'SMB', 'HML']]  # Garder seulement les facteurs
-        factors.columns = ['MKT', 'SMB', 'HML']  # Renommer les colonnes
+    def _missing_ranges(self, ticker, start, end) -> list:
+        if ticker not in self._index:
+            return [(start, end)]
+        covered_start, covered_end = self._index[ticker]
+        #Chaque plage reprend une séance définitive du cache, qui sert à recaler l'historique (cf. _store)
+        final = self._final_dates(ticker, self._load(ticker))
+        ranges = []
+        if start < covered_start:
+            ranges.append((start, str(final[0] + 1) if len(final) else covered_start))
+        if end > covered_end:
+            ranges.append((min(str(final[-1]), covered_end) if len(final) else covered_end, end))
+        return ranges
 
-        return factors
+    def _store(self, ticker, prices: pd.Series, start, end):
+        new = np.empty(len(prices), dtype=_RECORD)
+        new["date"] = prices.index.values.astype("M8[D]")
+        new["price"] = prices.values
 
-    except Exception as e:
-        print(f"Erreur lors du téléchargement des facteurs Fama-French : {e}")
-        return pd.DataFrame()
\ No newline at end of file
+        old = np.array(self._load(ticker))  #np.array -> copie, libère le memmap
+        self._records.pop(ticker, None)
+        if len(old) and len(new):
+            #Adj Close est recalculé sur tout l'historique à chaque dividende ou split : si la séance commune
+            #a changé depuis la mise en cache, le même facteur d'ajustement s'applique aux prix en cache
+            common = np.intersect1d(self._final_dates(ticker, old), new["date"])
+            if len(common):
+                ratio = new["price"][new["date"] == common[-1]][0] / old["price"][old["date"] == common[-1]][0]
+                if ratio != 1.0:
+                    old["price"] *= ratio
+
+        #Nouvelles données en premier : en cas de doublon de date, np.unique garde la plus récente
+        merged = np.concatenate([new, old])
+        _, first = np.unique(merged["date"], return_index=True)
+        np.save(self._path(ticker), merged[first])
+
+        #Pas de couverture au-delà d'aujourd'hui, sinon les prochaines séances ne seraient jamais téléchargées
+        end = min(end, pd.Timestamp.today().strftime("%Y-%m-%d"))
+        covered = self._index.get(ticker, [start, end])
+        self._index[ticker] = [min(covered[0], start), max(covered[1], end)]
+
+    @instrumented('data.cache_refresh')
+    def refresh(self, tickers, start=None, end=None):
+        """
+        Télécharge uniquement les plages absentes du cache (groupées par plage pour limiter les requêtes)
+        """
+        start = _as_day(start, "1970-01-01")
+        end = _as_day(end, pd.Timestamp.today() + pd.Timedelta(days=1))
+
+        requests = {}
+        for ticker in tickers:
+            for date_range in self._missing_ranges(ticker, start, end):
+                requests.setdefault(date_range, []).append(ticker)
+
+        for (range_start, range_end), group in requests.items():
+            fetched = self.source.fetch(group, range_start, range_end)
+            failed = getattr(self.source, "failures", {})
+            for ticker in group:
+                if ticker in failed or ticker not in fetched.columns:
+                    continue  #Pas de réponse pour ce ticker -> plage non couverte, redemandée au prochain appel
+                self._store(ticker, fetched[ticker].dropna(), range_start, range_end)
+
+        if requests:
+            with open(self._index_path, "w") as f:
+                json.dump(self._index, f)
+
+    @instrumented('data.cache_get')
+    def get(self, tickers, start=None, end=None) -> pd.DataFrame:
+        """
+        Prix ajustés sur [start, end) servis depuis le disque, après mise à jour des plages manquantes
+
+        Returns:
+            pd.DataFrame: Prix ajustés (une colonne par ticker, NaN si absent)
+        """
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        self.refresh(tickers, start, end)
+        start = np.datetime64(_as_day(start, "1970-01-01"))
+        end = np.datetime64(_as_day(end, pd.Timestamp.today() + pd.Timedelta(days=1)))
+
+        slices = []
+        for ticker in tickers:
+            records = self._load(ticker)
+            lo, hi = np.searchsorted(records["date"], [start, end])
+            slices.append(records[lo:hi])
+            count('data.bytes_read', records[lo:hi].nbytes)
+
+        #Union des dates puis remplissage par searchsorted (évite l'alignement pandas colonne par colonne)
+        dates = np.empty(0, dtype="M8[D]")
+        for records in slices:
+            if not np.array_equal(records["date"], dates):  #cas courant : même calendrier de cotation
+                dates = np.union1d(dates, records["date"])
+        matrix = np.full((len(dates), len(tickers)), np.nan)
+        for j, records in enumerate(slices):
+            if len(records) == len(dates):
+                matrix[:, j] = records["price"]
+            else:
+                matrix[np.searchsorted(dates, records["date"]), j] = records["price"]
+
+        return pd.DataFrame(matrix, index=pd.DatetimeIndex(dates.astype("M8[ns]"), name="Date"), columns=tickers)
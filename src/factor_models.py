@@ -1,7 +1,80 @@
 import numpy as np
 import pandas as pd
-from sklearn.linear_model import LinearRegression  #Pour estimer les betas
 
+from .instrumentation import instrumented
+
+
+def _batched_ols(X: np.ndarray, Y: np.ndarray) -> dict:
+    """
+    Régressions OLS de toutes les colonnes de Y sur le même design X (constante incluse dans X), en une passe
+    
+    Les actifs partageant le même motif de valeurs manquantes sont regroupés : une seule factorisation QR
+    de X par groupe, appliquée à toutes les colonnes du groupe. Un groupe avec moins d'observations que de
+    régresseurs ou un design de rang insuffisant donne des NaN pour ses actifs, sans interrompre les autres.
+    
+    Args:
+        X (np.ndarray): Design (T x k)
+        Y (np.ndarray): Rendements (T x m), NaN autorisés
+    
+    Returns:
+        dict: 'params' (k x m), 'bse' (k x m), 'pvalues' (k x m), 'rsquared' (m), 'nobs' (m), 'resid_var' (m)
+    """
+    from scipy import stats
+    from scipy.linalg import solve_triangular
+
+    T, k = X.shape
+    m = Y.shape[1]
+    params = np.full((k, m), np.nan)
+    bse = np.full((k, m), np.nan)
+    rsquared = np.full(m, np.nan)
+    resid_var = np.full(m, np.nan)
+    nobs = np.zeros(m, dtype=int)
+
+    #Lignes utilisables par actif (facteurs et rendement renseignés), regroupées par motif identique
+    valid = ~np.isnan(Y) & ~np.isnan(X).any(axis=1)[:, None]
+    patterns, group = np.unique(np.packbits(valid, axis=0), axis=1, return_inverse=True)
+    group = group.ravel()
+
+    for g in range(patterns.shape[1]):
+        cols = np.flatnonzero(group == g)
+        rows = valid[:, cols[0]]
+        n = rows.sum()
+        nobs[cols] = n
+        if n < k:
+            continue  #Pas assez d'observations : résultats NaN pour ces actifs seulement
+
+        Xg, Yg = X[rows], Y[np.ix_(rows, cols)]
+        Q, R = np.linalg.qr(Xg)
+        diag = np.abs(np.diag(R))
+        if diag.min() <= diag.max() * max(n, k) * np.finfo(float).eps:
+            continue  #Design de rang insuffisant (ex: facteur constant sur la période) -> NaN
+        try:
+            B = solve_triangular(R, Q.T @ Yg)
+            R_inv = solve_triangular(R, np.eye(k))
+        except np.linalg.LinAlgError:
+            continue
+        resid = Yg - Xg @ B
+
+        ssr = (resid ** 2).sum(axis=0)
+        sst = ((Yg - Yg.mean(axis=0)) ** 2).sum(axis=0)
+        xtx_inv_diag = (R_inv ** 2).sum(axis=1)  #diag((X'X)^-1) = diag(R^-1 R^-T)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sigma2 = ssr / (n - k)
+            bse[:, cols] = np.sqrt(xtx_inv_diag[:, None] * sigma2)
+            rsquared[cols] = 1 - ssr / sst
+            resid_var[cols] = sigma2
+        params[:, cols] = B
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tvalues = params / bse
+    pvalues = 2 * stats.t.sf(np.abs(tvalues), np.maximum(nobs - k, 1))
+    pvalues[:, nobs <= k] = np.nan
+
+    return {'params': params, 'bse': bse, 'pvalues': pvalues, 'rsquared': rsquared, 'nobs': nobs, 'resid_var': resid_var}
+
+
+@instrumented()
 def run_capm(prices: pd.DataFrame, benchmark: pd.Series, risk_free_rate: float = 0.0) -> pd.Series:
     """
     Calcule les betas CAPM pour chaque actif par rapport au benchmark
@@ -21,14 +94,13 @@ def run_capm(prices: pd.DataFrame, benchmark: pd.Series, risk_free_rate: float =
     rf_daily = risk_free_rate / 252
     excess_market = market_returns - rf_daily
 
-    #Pour chaques actifs : 1)Calcul le rendement excédentaire 2)Regression linéaire (Ri-Rf = A +B(Rm-Rf))
-    betas = {}
-    for ticker in returns.columns:
-        excess_asset = returns[ticker] - rf_daily
-        model = LinearRegression().fit(excess_market.values.reshape(-1, 1), excess_asset.values)
-        betas[ticker] = model.coef_[0]
-    
-    return pd.Series(betas)
+    #Rendements excédentaires puis une seule régression multi-actifs (Ri-Rf = A +B(Rm-Rf))
+    excess_assets = returns - rf_daily
+    excess_market, excess_assets = pd.Series(np.ravel(excess_market), index=excess_market.index).align(excess_assets, join="inner", axis=0)
+    X = np.column_stack([np.ones(len(excess_market)), excess_market.values])
+    fit = _batched_ols(X, excess_assets.values)
+
+    return pd.Series(fit['params'][1], index=returns.columns)
 
 def expected_returns_capm(betas: pd.Series, expected_market_return: float, risk_free_rate: float = 0.0) -> pd.Series:
     """
@@ -45,9 +117,9 @@ def expected_returns_capm(betas: pd.Series, expected_market_return: float, risk_
     return risk_free_rate + betas * (expected_market_return - risk_free_rate)
 
 #### Fama-French 3 Factors
-    
-# Ici statsmodels pour analyser la qualité du model + comparer avec CAPM
-import statsmodels.api as sm
+
+# Régression OLS fermée (alpha, betas, R², p-values) -> analyser la qualité du model + comparer avec CAPM
+@instrumented()
 def run_fama_french_stats(returns: pd.DataFrame, factors: pd.DataFrame, risk_free_rate: float = 0.0) -> pd.DataFrame:
     """
     Estime les betas Fama-French 3 facteurs + alpha, R², p-values pour chaque actif
@@ -61,44 +133,135 @@ def run_fama_french_stats(returns: pd.DataFrame, factors: pd.DataFrame, risk_fre
         pd.DataFrame: Résumé statistique par actif (alpha, betas, R², p-values)
     """
     rf_daily = risk_free_rate / 252  # Calcul du taux sans risque quotidien
-    excess_factors = factors - rf_daily  # Ajustement des facteurs Fama-French
-    results = []
+    excess_factors = factors[['MKT', 'SMB', 'HML']] - rf_daily  # Ajustement des facteurs Fama-French
+
+    # Alignement des dates (les lignes incomplètes sont écartées actif par actif dans _batched_ols)
+    excess_returns, excess_factors = (returns - rf_daily).align(excess_factors, join="outer", axis=0)
+    X = np.column_stack([np.ones(len(excess_factors)), excess_factors.values])
+    fit = _batched_ols(X, excess_returns.values.astype(float))
+
+    # Sécurité : ignorer les actifs sans données
+    empty = fit['nobs'] == 0
+    for ticker in returns.columns[empty]:
+        print(f"Données insuffisantes pour {ticker}, régression ignorée.")
+
+    params, pvalues = fit['params'], fit['pvalues']
+    results = pd.DataFrame({
+        'Alpha': params[0],
+        'Beta_MKT': params[1],
+        'Beta_SMB': params[2],
+        'Beta_HML': params[3],
+        'R_squared': fit['rsquared'],
+        'p_MKT': pvalues[1],
+        'p_SMB': pvalues[2],
+        'p_HML': pvalues[3]
+    }, index=returns.columns)
+
+    return results[~empty]
 
-    for ticker in returns.columns:
+
+#### Betas glissants (rolling / expanding)
+
+def _window_sums(X: np.ndarray, Y: np.ndarray, valid: np.ndarray, weights: np.ndarray):
+    """
+    Sommes pondérées exactes X'X, X'Y et part de X'X provenant des lignes manquantes de chaque actif
+    """
+    Xw = X * weights[:, None]
+    xtx = X.T @ Xw
+    xty = Xw.T @ Y
+    missing_xtx = np.einsum('ta,tp,tq->apq', ~valid, Xw, X)
+    return xtx, xty, missing_xtx
+
+
+@instrumented()
+def rolling_factor_betas(returns: pd.DataFrame, factors: pd.DataFrame, window: int = 252, expanding: bool = False, halflife: float = None, risk_free_rate: float = 0.0) -> np.ndarray:
+    """
+    Betas factoriels variables dans le temps, pour tous les actifs et toutes les dates
+    
+    X'X et X'y sont mis à jour incrémentalement (entrée de la nouvelle ligne, sortie de la plus ancienne)
+    pour tous les actifs à la fois, puis un petit système (k+1) x (k+1) est résolu à chaque date.
+    Les sommes sont recalculées exactement toutes les window dates pour éviter la dérive numérique.
+    
+    Args:
+        returns (pd.DataFrame): Rendements journaliers des actifs
+        factors (pd.DataFrame): Facteurs (ex: ['MKT', 'SMB', 'HML'] ou le marché seul pour le CAPM)
+        window (int): Taille de la fenêtre glissante (nombre minimal d'observations en mode expanding)
+        expanding (bool): Si True, fenêtre croissante depuis le début de l'échantillon
+        halflife (float): Demi-vie (en jours) de la pondération exponentielle, None -> poids égaux
+        risk_free_rate (float): Taux sans risque annuel
+    
+    Returns:
+        np.ndarray: Betas (dates x actifs x facteurs), axes alignés sur returns.index, returns.columns, factors.columns.
+            NaN tant que la fenêtre n'est pas remplie ou si un actif a trop peu d'observations.
+    """
+    rf_daily = risk_free_rate / 252
+    F = (factors.reindex(returns.index) - rf_daily).values.astype(float)
+    Y = (returns - rf_daily).values.astype(float)
+    T, m = Y.shape
+    k = F.shape[1]
+    p = k + 1
+
+    X = np.column_stack([np.ones(T), F])
+    valid = ~np.isnan(Y) & ~np.isnan(X).any(axis=1)[:, None]
+    X = np.where(np.isnan(X), 0.0, X)
+    Y = np.where(valid, Y, 0.0)
+
+    decay = 1.0 if halflife is None else 0.5 ** (1.0 / halflife)
+    tail = decay ** window  #Poids de la ligne qui sort de la fenêtre
+
+    xtx = np.zeros((p, p))
+    xty = np.zeros((p, m))
+    missing_xtx = np.zeros((m, p, p))
+    count = np.zeros(m, dtype=int)  #Observations valides par actif dans la fenêtre
+    length = 0  #Lignes dans la fenêtre
+    betas = np.full((T, m, k), np.nan)
+
+    for t in range(T):
+        x = X[t]
+        outer = np.outer(x, x)
+        invalid = ~valid[t]
+
+        xtx = decay * xtx + outer
+        xty = decay * xty + np.outer(x, Y[t])
+        if decay != 1.0:
+            missing_xtx *= decay
+        missing_xtx[invalid] += outer
+        count += valid[t]
+        length += 1
+
+        if not expanding and t >= window:
+            #Sortie de la ligne la plus ancienne
+            x_old = X[t - window]
+            outer_old = tail * np.outer(x_old, x_old)
+            xtx -= outer_old
+            xty -= tail * np.outer(x_old, Y[t - window])
+            missing_xtx[~valid[t - window]] -= outer_old
+            count -= valid[t - window]
+            length -= 1
+
+            if t % window == 0:
+                rows = slice(t - window + 1, t + 1)
+                weights = decay ** np.arange(window - 1, -1, -1)
+                xtx, xty, missing_xtx = _window_sums(X[rows], Y[rows], valid[rows], weights)
+
+        if length < window:
+            continue
+
+        #Actifs complets : un seul système partagé
+        complete = count == length
         try:
-            # Rendement excédentaire de l'actif
-            excess_returns = returns[ticker] - rf_daily
-            X = sm.add_constant(excess_factors)  # Ajouter la constante (intercept)
-
-            # Fusion des données pour filtrer les lignes valides
-            df = pd.concat([excess_returns, X], axis=1).dropna()
-            y = df.iloc[:, 0]  # Rendement excédentaire de l'actif
-            X_clean = df.iloc[:, 1:]  # Facteurs Fama-French (incluant la constante)
-
-            # Sécurité : ignorer si données vides
-            if X_clean.empty or y.empty:
-                print(f"Données insuffisantes pour {ticker}, régression ignorée.") 
-                continue
-
-            # Régression
-            model = sm.OLS(y, X_clean).fit()
-
-            # Collecter les résultats
-            row = {
-                'Alpha': model.params['const'] if 'const' in model.params else np.nan,
-                'Beta_MKT': model.params.get('MKT', np.nan),
-                'Beta_SMB': model.params.get('SMB', np.nan),
-                'Beta_HML': model.params.get('HML', np.nan),
-                'R_squared': model.rsquared,
-                'p_MKT': model.pvalues.get('MKT', np.nan),
-                'p_SMB': model.pvalues.get('SMB', np.nan),
-                'p_HML': model.pvalues.get('HML', np.nan)
-            }
-
-            results.append(pd.Series(row, name=ticker))
-
-        except Exception as e:
-            print(f"Erreur pour {ticker} : {e}")
-
-    return pd.DataFrame(results)
+            betas[t, complete] = np.linalg.solve(xtx, xty[:, complete])[1:].T
+        except np.linalg.LinAlgError:
+            pass
+
+        #Actifs avec valeurs manquantes dans la fenêtre : X'X propre à chacun
+        partial = np.flatnonzero(~complete & (count >= p + 1))
+        if len(partial):
+            own_xtx = xtx - missing_xtx[partial]
+            solvable = np.abs(np.linalg.det(own_xtx)) > 1e-300
+            if solvable.any():
+                solved = np.linalg.solve(own_xtx[solvable], xty[:, partial[solvable]].T[..., None])[..., 0]
+                betas[t, partial[solvable]] = solved[:, 1:]
+
+    return betas
 
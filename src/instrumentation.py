@@ -0,0 +1,199 @@
+import os
+import json
+import time
+import functools
+import threading
+from collections import defaultdict
+
+import pandas as pd
+
+_profiler = None  #Profiler actif (None -> instrumentation désactivée, coût d'un test par appel)
+
+
+class _NullSpan:
+    """Span inactif renvoyé quand aucun Profiler n'est actif"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("profiler", "name", "args", "start")
+
+    def __init__(self, profiler, name: str, args: dict):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.profiler._stack().append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        self.profiler._stack().pop()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.profiler.record(self.name, self.start, duration, **self.args)
+        return False
+
+
+def enabled() -> bool:
+    return _profiler is not None
+
+
+def span(name: str, **args):
+    """
+    Mesure le bloc `with span(...)` si un Profiler est actif (args : attributs de l'événement, ex: date)
+    """
+    if _profiler is None:
+        return _NULL_SPAN
+    return _Span(_profiler, name, args)
+
+
+def count(name: str, value: float = 1):
+    """Incrémente le compteur name du Profiler actif"""
+    if _profiler is not None:
+        _profiler.count(name, value)
+
+
+def annotate(**args):
+    """Ajoute des attributs au span ouvert le plus interne du thread courant (ex: itérations de l'optimiseur)"""
+    if _profiler is not None:
+        stack = _profiler._stack()
+        if stack:
+            stack[-1].args.update(args)
+
+
+def instrumented(name: str = None):
+    """
+    Décorateur : chaque appel de la fonction devient un span (nom par défaut : module.fonction)
+    """
+    def decorator(fn):
+        label = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _profiler is None:
+                return fn(*args, **kwargs)
+            with _Span(_profiler, label, {}):
+                return fn(*args, **kwargs)
+
+        return wrapper
+    return decorator
+
+
+class Profiler:
+    """
+    Collecte des temps par étape, compteurs (appels, itérations et échecs des optimiseurs, octets chargés)
+    et événements horodatés de tout le pipeline, uniquement à l'intérieur du bloc `with Profiler() as prof:`.
+
+    Hors d'un Profiler, les points d'instrumentation ne coûtent qu'un test de variable globale.
+    Les workers de compare_strategies / parameter_sweep (n_jobs != 1) tournent dans d'autres processus et ne sont pas mesurés.
+
+    Args:
+        callback: fonction appelée avec chaque événement (dict name, start, duration, thread, args) dès sa fin
+    """
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.events = []
+        self.counters = defaultdict(float)
+        self._origin = time.perf_counter()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._previous = None
+
+    def __enter__(self):
+        global _profiler
+        self._previous, _profiler = _profiler, self
+        return self
+
+    def __exit__(self, *exc):
+        global _profiler
+        _profiler = self._previous
+        return False
+
+    def _stack(self) -> list:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def record(self, name: str, start: float, duration: float, **args):
+        event = {
+            "name": name,
+            "start": start - self._origin,
+            "duration": duration,
+            "thread": threading.get_ident(),
+            "args": args,
+        }
+        self.events.append(event)
+        if self.callback is not None:
+            self.callback(event)
+
+    def count(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] += value
+
+    #### Restitution
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Returns:
+            pd.DataFrame: par étape, nombre d'appels et temps total / moyen / max (s), trié par temps total
+        """
+        if not self.events:
+            return pd.DataFrame(columns=["Calls", "Total (s)", "Mean (s)", "Max (s)"])
+        events = pd.DataFrame(self.events)
+        table = events.groupby("name")["duration"].agg(["count", "sum", "mean", "max"])
+        table.columns = ["Calls", "Total (s)", "Mean (s)", "Max (s)"]
+        return table.sort_values("Total (s)", ascending=False)
+
+    def breakdown(self, key: str = "date") -> pd.DataFrame:
+        """
+        Temps par valeur de l'attribut key et par étape (ex: détail par date de rééquilibrage de rolling_backtest)
+
+        Returns:
+            pd.DataFrame: valeurs de key x étapes, durées (s)
+        """
+        rows = [(event["args"][key], event["name"], event["duration"]) for event in self.events if key in event["args"]]
+        table = pd.DataFrame(rows, columns=[key, "name", "duration"])
+        return table.pivot_table(index=key, columns="name", values="duration", aggfunc="sum", sort=False)
+
+    def to_dict(self) -> dict:
+        return {
+            "counters": dict(self.counters),
+            "summary": self.summary().reset_index().to_dict(orient="records"),
+            "events": self.events,
+        }
+
+    def to_json(self, path: str):
+        """Compteurs, résumé par étape et événements au format JSON"""
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2, default=str)
+
+    def to_chrome_trace(self, path: str):
+        """
+        Événements au format Chrome trace (chrome://tracing, Perfetto), compteurs dans otherData
+        """
+        pid = os.getpid()
+        trace = [{
+            "name": event["name"],
+            "ph": "X",
+            "ts": event["start"] * 1e6,
+            "dur": event["duration"] * 1e6,
+            "pid": pid,
+            "tid": event["thread"],
+            "args": event["args"],
+        } for event in self.events]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": trace, "otherData": dict(self.counters)}, f, default=str)
@@ -0,0 +1,137 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+
+class ReturnsPanel:
+    """
+    Panel de rendements (jours x actifs) stocké dans un seul tableau NumPy contigu, éventuellement en float32
+    ou mappé en mémoire depuis le disque, pour les univers trop grands pour un DataFrame float64 en RAM.
+
+    Les dates (datetime64[D]) et les tickers sont conservés à part sous forme de tableaux légers.
+    Les fenêtres (window) sont des vues sans copie ; l'objet expose index, columns, values et shape,
+    et s'utilise à la place d'un DataFrame dans rolling_backtest, compare_strategies et parameter_sweep
+    (qui exigent des rendements sans NaN).
+
+    Args:
+        values: rendements (jours x actifs), np.ndarray ou np.memmap
+        dates: dates des lignes
+        tickers: noms des colonnes
+    """
+
+    def __init__(self, values: np.ndarray, dates, tickers):
+        if values.ndim != 2 or not values.flags.c_contiguous:
+            raise ValueError("values doit être un tableau 2D contigu (jours x actifs).")
+        self.values = values
+        self.dates = np.asarray(dates, dtype='M8[D]')
+        self.tickers = np.asarray(tickers, dtype=str)
+        if values.shape != (len(self.dates), len(self.tickers)):
+            raise ValueError("Dimensions incohérentes entre values, dates et tickers.")
+
+    @property
+    def shape(self) -> tuple:
+        return self.values.shape
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self.values.dtype
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    @property
+    def index(self) -> pd.DatetimeIndex:
+        return pd.DatetimeIndex(self.dates)
+
+    @property
+    def columns(self) -> pd.Index:
+        return pd.Index(self.tickers)
+
+    def window(self, start: int, stop: int) -> np.ndarray:
+        """Lignes start..stop-1, vue sans copie"""
+        return self.values[start:stop]
+
+    def frame(self, start: int = None, stop: int = None) -> pd.DataFrame:
+        """Lignes start..stop-1 sous forme de DataFrame construit autour de la vue (sans copie des valeurs)"""
+        return pd.DataFrame(self.values[start:stop], index=self.index[start:stop], columns=self.columns, copy=False)
+
+    #### Construction et persistance
+
+    @classmethod
+    def from_prices(cls, prices, log: bool = True, dtype=np.float32, path: str = None, dates=None, tickers=None, chunk_size: int = 256) -> "ReturnsPanel":
+        """
+        Rendements calculés par blocs de lignes, directement dans le tableau de sortie (aucun DataFrame temporaire)
+
+        Args:
+            prices: prix (pd.DataFrame, ou np.ndarray / np.memmap avec dates et tickers)
+            log: si True, rendements logarithmiques, sinon rendements simples
+            dtype: type des rendements (float32 -> moitié de la mémoire de float64)
+            path: dossier de sortie -> rendements écrits dans un fichier mappé en mémoire (None -> en RAM)
+            dates, tickers: dates et tickers des prix si prices n'est pas un DataFrame
+            chunk_size: nombre de lignes converties en float64 à la fois
+
+        Les NaN (titres non encore cotés ou retirés) sont conservés : la première ligne de prix est seulement retirée.
+        rolling_backtest refuse les NaN (ValueError) : restreindre la période ou les tickers avant le backtest.
+
+        Returns:
+            ReturnsPanel: rendements (jours - 1 x actifs)
+        """
+        if isinstance(prices, pd.DataFrame):
+            dates, tickers = prices.index.values, prices.columns.values
+            prices = prices.to_numpy()
+        T, n = prices.shape[0] - 1, prices.shape[1]
+
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            values = np.lib.format.open_memmap(os.path.join(path, "values.npy"), mode="w+", dtype=dtype, shape=(T, n))
+        else:
+            values = np.empty((T, n), dtype=dtype)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for start in range(0, T, chunk_size):
+                stop = min(start + chunk_size, T)
+                block = np.asarray(prices[start:stop + 1], dtype=float)
+                ratio = block[1:] / block[:-1]
+                if log:
+                    np.log(ratio, out=ratio)
+                else:
+                    ratio -= 1
+                values[start:stop] = ratio
+
+        panel = cls(values, np.asarray(dates)[1:], tickers)
+        if path is not None:
+            values.flush()
+            panel._save_index(path)
+        return panel
+
+    @classmethod
+    def from_frame(cls, returns: pd.DataFrame, dtype=np.float32) -> "ReturnsPanel":
+        """Panel à partir d'un DataFrame de rendements déjà calculés"""
+        return cls(np.ascontiguousarray(returns.to_numpy(dtype=dtype)), returns.index.values, returns.columns.values)
+
+    def _save_index(self, path: str):
+        np.save(os.path.join(path, "dates.npy"), self.dates)
+        np.save(os.path.join(path, "tickers.npy"), self.tickers)
+
+    def save(self, path: str):
+        """
+        Enregistre le panel dans le dossier path (values.npy, dates.npy, tickers.npy), relisible avec ReturnsPanel.open
+        """
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "values.npy"), self.values)
+        self._save_index(path)
+
+    @classmethod
+    def open(cls, path: str, mode: str = "r") -> "ReturnsPanel":
+        """
+        Ouvre un panel enregistré, les rendements restant sur disque (np.memmap, pages chargées à la demande)
+
+        Args:
+            path: dossier du panel
+            mode: 'r' lecture seule, 'r+' lecture/écriture, 'c' copie à l'écriture
+        """
+        values = np.load(os.path.join(path, "values.npy"), mmap_mode=mode)
+        dates = np.load(os.path.join(path, "dates.npy"))
+        tickers = np.load(os.path.join(path, "tickers.npy"))
+        return cls(values, dates, tickers)
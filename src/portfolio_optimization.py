@@ -1,70 +1,176 @@
+import hashlib
+from collections import OrderedDict
+
 import numpy as np
 import pandas as pd
-from scipy.optimize import minimize #Optimisation numérique
+from scipy import sparse
+from scipy.linalg import cho_factor, cho_solve
+from scipy.optimize import minimize, linprog, OptimizeResult #Optimisation numérique
+
+from .instrumentation import instrumented, count, annotate
+
+
+def _as_operator(cov_matrix):
+    """
+    Matrice de covariance dense (np.ndarray) ou opérateur structuré (ex: covariance.FactorCovariance, produit en O(n·k))
+    """
+    return cov_matrix if hasattr(cov_matrix, "specific_var") else np.asarray(cov_matrix, dtype=float)
+
+
+def _variance_with_grad(cov_matrix):
+    """
+    Fonction w -> (variance, gradient) partageant le produit cov @ w (un seul produit matrice-vecteur par évaluation)
+    
+    La variance est divisée par la variance moyenne des actifs : même argmin, mais un objectif d'ordre 1
+    pour que le critère d'arrêt (ftol) de SLSQP ne coupe pas l'optimisation dès la première itération.
+    """
+    scale = 1.0 / np.mean(cov_matrix.diagonal())
+
+    def variance_with_grad(w):
+        cov_w = (cov_matrix @ w) * scale
+        return w @ cov_w, 2 * cov_w
+
+    return variance_with_grad
+
 
-def mean_variance_optimization(expected_returns: np.ndarray, cov_matrix: np.ndarray, target_return: float) -> np.ndarray:
+def _initial_weights(n: int, init_weights: np.ndarray = None) -> np.ndarray:
+    if init_weights is None:
+        return np.ones(n) / n #Portfeuille égalitaire
+    return np.clip(np.asarray(init_weights, dtype=float), 0, 1)
+
+
+def _output(result, return_info: bool, objective=None):
+    """
+    Poids optimaux, et si demandé les diagnostics du solveur (itérations, convergence, objectif)
+    
+    objective (w -> valeur) recalcule l'objectif du problème à la solution : 'fun' est alors sans la mise à l'échelle
+    interne ni la pénalité de rotation (ex: variance w'Σw), sinon la valeur minimisée par le solveur.
+    """
+    #Instrumentation (sans effet hors d'un Profiler)
+    count('optimizer.iterations', result.nit)
+    if not result.success:
+        count('optimizer.failures')
+    annotate(nit=int(result.nit), success=bool(result.success))
+
+    if not return_info:
+        return result.x
+    return result.x, {
+        'nit': result.nit,
+        'success': bool(result.success),
+        'status': result.status,
+        'message': result.message,
+        'fun': float(result.fun if objective is None else objective(result.x)),
+    }
+
+
+def _with_turnover(objective, current_weights: np.ndarray = None, turnover_penalty: float = 0.0):
+    """
+    Ajoute à objective (w -> (valeur, gradient)) la pénalité de rotation turnover_penalty * sum|w - current_weights|
+    
+    La valeur absolue est lissée (sqrt(d² + eps)) pour rester dérivable en 0 (SLSQP).
+    """
+    if not turnover_penalty or current_weights is None:
+        return objective
+    current_weights = np.asarray(current_weights, dtype=float)
+
+    def penalized(w):
+        value, grad = objective(w)
+        d = w - current_weights
+        smooth = np.sqrt(d * d + 1e-10)
+        return value + turnover_penalty * smooth.sum(), grad + turnover_penalty * d / smooth
+
+    return penalized
+
+
+#Contrainte somme des poids = 1, avec son jacobien
+def _budget_constraint(n: int) -> dict:
+    ones = np.ones(n)
+    return {'type': 'eq', 'fun': lambda w: np.sum(w) - 1, 'jac': lambda w: ones}
+
+
+@instrumented()
+def mean_variance_optimization(expected_returns: np.ndarray, cov_matrix: np.ndarray, target_return: float, init_weights: np.ndarray = None, return_info: bool = False, current_weights: np.ndarray = None, turnover_penalty: float = 0.0) -> np.ndarray:
     """
     Minimise la variance pour un rendement cible, trouver les poids tout en atteignant le rendement ciblé
+    
+    init_weights (point de départ, ex: poids du rééquilibrage précédent) et return_info (-> (poids, diagnostics))
+    sont communs à tous les optimiseurs du module. current_weights et turnover_penalty (optimiseurs SLSQP) ajoutent
+    à l'objectif turnover_penalty * sum|w - current_weights| pour limiter la rotation au rééquilibrage.
+    Dans les diagnostics, 'fun' est l'objectif à la solution hors pénalité (variance w'Σw ici, -Sharpe pour
+    max_sharpe_portfolio, CVaR pour min_cvar_portfolio, volatilité pour risk_parity_portfolio).
     """
     n = len(expected_returns) #Nbr actifs
+    expected_returns = np.asarray(expected_returns, dtype=float)
+    cov_matrix = _as_operator(cov_matrix)
 
-    #Fonction objectif
-    def portfolio_variance(weights):   
-        return weights.T @ cov_matrix @ weights   
+    #Fonction objectif (variance + gradient analytique)
+    portfolio_variance = _variance_with_grad(cov_matrix)
 
     #Somme des poids = 1
     constraints = [
-        {'type': 'eq', 'fun': lambda w: np.sum(w) - 1},
-        {'type': 'eq', 'fun': lambda w: w @ expected_returns - target_return}
+        _budget_constraint(n),
+        {'type': 'eq', 'fun': lambda w: w @ expected_returns - target_return, 'jac': lambda w: expected_returns}
     ]
     
     bounds = [(0, 1) for _ in range(n)] #Pas de vente à découvert
-    init_guess = np.ones(n) / n #Portfeuille égalitaire
+    init_guess = _initial_weights(n, init_weights)
 
-    result = minimize(portfolio_variance, init_guess, bounds=bounds, constraints=constraints)
-    return result.x
+    objective = _with_turnover(portfolio_variance, current_weights, turnover_penalty)
+    result = minimize(objective, init_guess, jac=True, method='SLSQP', bounds=bounds, constraints=constraints)
+    return _output(result, return_info, lambda w: w @ (cov_matrix @ w))
 
 
-def max_sharpe_portfolio(expected_returns: np.ndarray, cov_matrix: np.ndarray, risk_free_rate: float = 0.0) -> np.ndarray:
+@instrumented()
+def max_sharpe_portfolio(expected_returns: np.ndarray, cov_matrix: np.ndarray, risk_free_rate: float = 0.0, init_weights: np.ndarray = None, return_info: bool = False, current_weights: np.ndarray = None, turnover_penalty: float = 0.0) -> np.ndarray:
     """
     Maximisation du ratio de Sharpe
     """
     n = len(expected_returns)
+    expected_returns = np.asarray(expected_returns, dtype=float)
+    cov_matrix = _as_operator(cov_matrix)
 
     #Negatif du sharp -> car on cherche à minimiser (minimize)
     def neg_sharpe(weights):
-        port_return = weights @ expected_returns
-        port_vol = np.sqrt(weights.T @ cov_matrix @ weights)
-        return - (port_return - risk_free_rate) / port_vol
+        cov_w = cov_matrix @ weights
+        port_vol = np.sqrt(weights @ cov_w)
+        excess = weights @ expected_returns - risk_free_rate
+        #d(-S)/dw = -mu/vol + excess * cov @ w / vol^3
+        grad = -expected_returns / port_vol + excess * cov_w / port_vol ** 3
+        return - excess / port_vol, grad
 
-    constraints = [{'type': 'eq', 'fun': lambda w: np.sum(w) - 1}]
+    constraints = [_budget_constraint(n)]
     bounds = [(0, 1) for _ in range(n)]
-    init_guess = np.ones(n) / n
+    init_guess = _initial_weights(n, init_weights)
 
-    result = minimize(neg_sharpe, init_guess, bounds=bounds, constraints=constraints)
-    return result.x
+    objective = _with_turnover(neg_sharpe, current_weights, turnover_penalty)
+    result = minimize(objective, init_guess, jac=True, method='SLSQP', bounds=bounds, constraints=constraints)
+    return _output(result, return_info, lambda w: neg_sharpe(w)[0])
 
 
 
-def min_variance_portfolio(cov_matrix: np.ndarray) -> np.ndarray:
+@instrumented()
+def min_variance_portfolio(cov_matrix: np.ndarray, init_weights: np.ndarray = None, return_info: bool = False, current_weights: np.ndarray = None, turnover_penalty: float = 0.0) -> np.ndarray:
     """
     Portefeuille à volatilité minimale
     """
+    cov_matrix = _as_operator(cov_matrix)
     n = cov_matrix.shape[0]
 
-    def portfolio_volatility(weights):
-        return np.sqrt(weights.T @ cov_matrix @ weights)
+    #Même minimum que la volatilité, mais la variance est quadratique (gradient plus simple)
+    portfolio_variance = _variance_with_grad(cov_matrix)
 
-    constraints = [{'type': 'eq', 'fun': lambda w: np.sum(w) - 1}]
+    constraints = [_budget_constraint(n)]
     bounds = [(0, 1) for _ in range(n)]
-    init_guess = np.ones(n) / n
+    init_guess = _initial_weights(n, init_weights)
 
-    result = minimize(portfolio_volatility, init_guess, bounds=bounds, constraints=constraints)
-    return result.x
+    objective = _with_turnover(portfolio_variance, current_weights, turnover_penalty)
+    result = minimize(objective, init_guess, jac=True, method='SLSQP', bounds=bounds, constraints=constraints)
+    return _output(result, return_info, lambda w: w @ (cov_matrix @ w))
 
 
 
-def custom_objective_portfolio(objective_fn, expected_returns: np.ndarray, cov_matrix: np.ndarray, constraints=None, bounds=None) -> np.ndarray:
+@instrumented()
+def custom_objective_portfolio(objective_fn, expected_returns: np.ndarray, cov_matrix: np.ndarray, constraints=None, bounds=None, jac=None, init_weights: np.ndarray = None, return_info: bool = False) -> np.ndarray:
     """
     Optimisation avec objectif personnalisé
     
@@ -78,16 +184,338 @@ def custom_objective_portfolio(objective_fn, expected_returns: np.ndarray, cov_m
         cov_matrix: matrice de covariance
         constraints: contraintes supplémentaires
         bounds: bornes sur les poids
+        jac: gradient de objective_fn (ou True si objective_fn retourne (valeur, gradient)),
+            None -> différences finies
+        init_weights: point de départ (par défaut portefeuille égalitaire)
+        return_info: si True, retourne aussi les diagnostics du solveur
     
     Returns:
-        np.ndarray: poids optimaux
+        np.ndarray: poids optimaux (ou (poids, dict) si return_info)
     """
     n = len(expected_returns)
     if bounds is None:
         bounds = [(0, 1) for _ in range(n)]
     if constraints is None:
-        constraints = [{'type': 'eq', 'fun': lambda w: np.sum(w) - 1}]
-    init_guess = np.ones(n) / n
+        constraints = [_budget_constraint(n)]
+    init_guess = _initial_weights(n, init_weights)
+
+    result = minimize(objective_fn, init_guess, jac=jac, method='SLSQP', bounds=bounds, constraints=constraints)
+    return _output(result, return_info)
+
+
+
+def _critical_line(expected_returns: np.ndarray, cov: np.ndarray) -> np.ndarray:
+    """
+    Portefeuilles d'angle de la frontière long-only (somme des poids = 1, w >= 0), algorithme de la ligne critique
+    
+    On parcourt min 1/2·w'Σw - λ·mu'w de λ = +inf (actif de rendement maximal seul) à λ = 0 (variance minimale).
+    À ensemble d'actifs libres F fixé, les poids sont affines en λ : un angle apparaît quand un poids libre s'annule
+    ou quand le multiplicateur de KKT d'un actif à 0 s'annule (l'actif entre dans F).
+    
+    Returns:
+        np.ndarray: poids des portefeuilles d'angle (angles x n), du rendement maximal à la variance minimale
+    """
+    n = len(expected_returns)
+    free = np.zeros(n, dtype=bool)
+    free[np.argmax(expected_returns)] = True
+    lam, changed = np.inf, -1
+    corners = []
+
+    for _ in range(4 * n + 1):  #Garde-fou : chaque angle ajoute ou retire un actif
+        F, B = np.flatnonzero(free), np.flatnonzero(~free)
+        S = np.linalg.solve(cov[np.ix_(F, F)], np.column_stack([np.ones(len(F)), expected_returns[F]]))
+        s11, s1m = S.sum(axis=0)
+        #w_F = alpha + λ·beta, et multiplicateur du budget gamma = g0 + λ·g1
+        alpha = S[:, 0] / s11
+        beta = S[:, 1] - alpha * s1m
+        g0, g1 = 1 / s11, -s1m / s11
+        #Multiplicateurs des actifs à 0 : nu = Σ_BF·w_F - gamma - λ·mu_B = p + λ·q (>= 0)
+        cross = cov[np.ix_(B, F)]
+        p = cross @ alpha - g0
+        q = cross @ beta - g1 - expected_returns[B]
+
+        #Prochain angle : plus grand λ < lam où un poids libre s'annule ou un multiplicateur s'annule
+        with np.errstate(divide='ignore', invalid='ignore'):
+            leave = np.where(beta > 0, -alpha / beta, -np.inf)
+            enter = np.where(q > 0, -p / q, -np.inf)
+        events = np.concatenate([leave, enter])
+        events[(events >= lam) | (np.concatenate([F, B]) == changed)] = -np.inf
+        k = int(np.argmax(events)) if len(events) else 0
+
+        if lam == np.inf:
+            corners.append((F, alpha))  #Angle de départ (beta = 0 pour un seul actif)
+        if not len(events) or events[k] <= 0:
+            corners.append((F, alpha))  #λ = 0 : portefeuille à variance minimale
+            break
+        lam = events[k]
+        corners.append((F, alpha + lam * beta))
+        changed = np.concatenate([F, B])[k]
+        free[changed] = k >= len(F)
+
+    weights = np.zeros((len(corners), n))
+    for row, (F, w) in zip(weights, corners):
+        row[F] = np.maximum(w, 0)
+    return weights / weights.sum(axis=1, keepdims=True)
+
+
+@instrumented()
+def compute_efficient_frontier(expected_returns: np.ndarray, cov_matrix: np.ndarray, n_points: int = 50, risk_free_rate: float = 0.0, method: str = 'critical_line') -> dict:
+    """
+    Calcule la frontière efficiente long-only en une seule passe, du rendement de la variance minimale au rendement maximal
+    
+    'critical_line' : portefeuilles d'angle exacts (algorithme de la ligne critique), puis chaque point est
+    l'interpolation linéaire des deux angles qui l'encadrent (les poids sont affines en rendement entre deux angles).
+    'slsqp' : un SLSQP par point, repartant de la solution précédente (warm start) avec gradients analytiques ;
+    les points où le solveur échoue sont à NaN et signalés par 'success'.
+    
+    Args:
+        expected_returns: rendements attendus
+        cov_matrix: matrice de covariance (dense ou FactorCovariance)
+        n_points: nombre de points sur la frontière
+        risk_free_rate: taux sans risque (même périodicité que expected_returns)
+        method: 'critical_line' (matrice singulière -> 'slsqp') ou 'slsqp'
+    
+    Returns:
+        dict: 'weights' (n_points x n), 'risks', 'returns', 'sharpes' -> directement utilisable par export_report_pdf,
+        et 'success' (booléens, points résolus)
+    """
+    expected_returns = np.asarray(expected_returns, dtype=float)
+    cov_matrix = _as_operator(cov_matrix)
+    n = len(expected_returns)
+
+    if method not in ('critical_line', 'slsqp'):
+        raise ValueError("method doit être 'critical_line' ou 'slsqp'.")
+
+    weights = None
+    if method == 'critical_line':
+        dense = cov_matrix.to_dense() if hasattr(cov_matrix, "to_dense") else cov_matrix
+        try:
+            corners = _critical_line(expected_returns, dense)[::-1]  #Rendements croissants
+        except np.linalg.LinAlgError:
+            corners = None
+        if corners is not None:
+            corner_returns = corners @ expected_returns
+            targets = np.linspace(corner_returns[0], expected_returns.max(), n_points)
+            if len(corners) == 1:
+                weights = np.repeat(corners, n_points, axis=0)
+            else:
+                k = np.clip(np.searchsorted(corner_returns, targets, side='right') - 1, 0, len(corners) - 2)
+                gap = corner_returns[k + 1] - corner_returns[k]
+                theta = np.divide(targets - corner_returns[k], gap, out=np.zeros(n_points), where=gap > 0)
+                weights = (1 - theta[:, None]) * corners[k] + theta[:, None] * corners[k + 1]
+            success = np.ones(n_points, dtype=bool)
+
+    if weights is None:
+        portfolio_variance = _variance_with_grad(cov_matrix)
+        bounds = [(0, 1) for _ in range(n)]
+        budget = _budget_constraint(n)
+
+        #Point de départ : portefeuille à variance minimale
+        result = minimize(portfolio_variance, np.ones(n) / n, jac=True, method='SLSQP', bounds=bounds, constraints=[budget])
+        w = result.x
+
+        targets = np.linspace(w @ expected_returns, expected_returns.max(), n_points)
+        weights = np.full((n_points, n), np.nan)
+        success = np.zeros(n_points, dtype=bool)
+
+        for k, target_return in enumerate(targets):
+            constraints = [
+                budget,
+                {'type': 'eq', 'fun': lambda w, t=target_return: w @ expected_returns - t, 'jac': lambda w: expected_returns}
+            ]
+            result = minimize(portfolio_variance, w, jac=True, method='SLSQP', bounds=bounds, constraints=constraints)
+            count('optimizer.iterations', result.nit)
+            if not result.success:
+                count('optimizer.failures')
+                continue  #Point non résolu : reste à NaN
+            w = result.x  #Warm start pour le point suivant
+            weights[k], success[k] = w, True
+
+    returns = weights @ expected_returns
+    risks = np.sqrt(np.sum(weights * (cov_matrix @ weights.T).T, axis=1))
+    sharpes = (returns - risk_free_rate) / risks
+
+    return {'weights': weights, 'risks': risks, 'returns': returns, 'sharpes': sharpes, 'success': success}
+
+
+def _cvar_lp(scenarios: np.ndarray, weight: float, expected_returns: np.ndarray, target_return: float):
+    """
+    Programme linéaire de Rockafellar-Uryasev sur un sous-ensemble de scénarios, variables [w (n), VaR (1), u (S)]
+    """
+    S, n = scenarios.shape
+    c = np.concatenate([np.zeros(n), [1.0], np.full(S, weight)])
+    A_ub = sparse.hstack([sparse.csr_matrix(-scenarios), -np.ones((S, 1)), -sparse.identity(S)], format='csr')
+    b_ub = np.zeros(S)
+    if target_return is not None:
+        row = sparse.csr_matrix(np.concatenate([-expected_returns, np.zeros(1 + S)]))
+        A_ub = sparse.vstack([A_ub, row], format='csr')
+        b_ub = np.append(b_ub, -target_return)
+    A_eq = sparse.csr_matrix(np.concatenate([np.ones(n), np.zeros(1 + S)]))
+    bounds = [(0, 1)] * n + [(None, None)] + [(0, None)] * S
+
+    return linprog(c, A_ub=A_ub, b_ub=b_ub, A_eq=A_eq, b_eq=[1.0], bounds=bounds, method='highs')
+
+
+@instrumented()
+def min_cvar_portfolio(expected_returns: np.ndarray, cov_matrix=None, scenarios: np.ndarray = None, alpha: float = 0.95, target_return: float = None, return_info: bool = False) -> np.ndarray:
+    """
+    Minimisation de la CVaR (Expected Shortfall) sur des scénarios de rendements, formulation linéaire de
+    Rockafellar-Uryasev résolue par HiGHS :
+        min  VaR + 1/((1-alpha)·S) · sum(u_s)
+        s.c. u_s >= -r_s·w - VaR,  u_s >= 0,  sum(w) = 1,  0 <= w <= 1,  (mu·w >= target_return)
+    
+    Seuls ~(1-alpha)·S scénarios ont u_s > 0 : le programme est résolu sur un sous-ensemble de scénarios
+    (les pires pertes), puis les scénarios écartés dont la contrainte est violée sont ajoutés jusqu'à ce qu'il
+    n'y en ait plus -> même optimum que le programme complet, avec des LP bien plus petits.
+    
+    Utilisable directement comme strategy_fn de rolling_backtest (les rendements de la fenêtre sont passés en scenarios).
+    
+    Args:
+        expected_returns: rendements attendus (contrainte de rendement cible)
+        cov_matrix: non utilisée (signature commune aux stratégies)
+        scenarios: scénarios de rendements (S x n), historiques ou simulés
+        alpha: niveau de confiance de la CVaR
+        target_return: rendement minimal (optionnel)
+        return_info: si True, retourne aussi les diagnostics du solveur
+    
+    Returns:
+        np.ndarray: poids optimaux (ou (poids, dict) si return_info)
+    """
+    if scenarios is None:
+        raise ValueError("min_cvar_portfolio nécessite des scénarios de rendements.")
+    scenarios = np.asarray(scenarios, dtype=float)
+    expected_returns = np.asarray(expected_returns, dtype=float)
+    S, n = scenarios.shape
+    weight = 1.0 / ((1 - alpha) * S)
+    tail = int(np.ceil((1 - alpha) * S))
+
+    #Sous-ensemble initial : les pires pertes du portefeuille égalitaire
+    active = np.argsort(scenarios.mean(axis=1))[:min(S, 2 * tail)]
+    nit = 0
+    while True:
+        result = _cvar_lp(scenarios[active], weight, expected_returns, target_return)
+        nit += result.nit
+        if not result.success:
+            break
+        excess = -scenarios @ result.x[:n] - result.x[n]
+        excess[active] = -np.inf
+        violated = np.flatnonzero(excess > 1e-10)
+        if len(violated) == 0:
+            break
+        active = np.concatenate([active, violated[np.argsort(excess[violated])[::-1][:tail]]])
+
+    result.nit = nit
+    if result.x is None:  #Programme infaisable (rendement cible inatteignable)
+        result.x, result.fun = np.full(n + 1, np.nan), np.nan
+    result.x = result.x[:n]
+    return _output(result, return_info)
+
+
+
+@instrumented()
+def risk_parity_portfolio(cov_matrix, risk_budget: np.ndarray = None, tol: float = 1e-10, max_iter: int = 100, return_info: bool = False) -> np.ndarray:
+    """
+    Portefeuille à contributions au risque égales (ou proportionnelles à risk_budget)
+    
+    Méthode de Newton amortie sur le problème convexe min 1/2·y'Σy - sum(b·log y), puis w = y / sum(y) :
+    à l'optimum y_i·(Σy)_i = b_i, donc chaque actif contribue au risque en proportion de b_i.
+    Pour rolling_backtest : lambda mu, cov: risk_parity_portfolio(cov)
+    
+    Args:
+        cov_matrix: matrice de covariance (dense ou FactorCovariance)
+        risk_budget: budgets de risque (par défaut égaux)
+        tol: tolérance sur l'écart aux budgets
+        max_iter: nombre maximal d'itérations de Newton
+        return_info: si True, retourne aussi les diagnostics du solveur
+    
+    Returns:
+        np.ndarray: poids (ou (poids, dict) si return_info)
+    """
+    cov = _as_operator(cov_matrix)
+    cov = cov.to_dense() if hasattr(cov, "to_dense") else cov
+    n = cov.shape[0]
+    b = np.ones(n) / n if risk_budget is None else np.asarray(risk_budget, dtype=float) / np.sum(risk_budget)
+
+    #Départ : inverse volatilité, mis à l'échelle de la solution (y'Σy = sum(b) = 1)
+    y = 1 / np.sqrt(np.diag(cov))
+    y /= np.sqrt(y @ cov @ y)
+
+    def objective(y):
+        return 0.5 * y @ cov @ y - b @ np.log(y)
+
+    status, nit = 1, 0
+    for nit in range(1, max_iter + 1):
+        cov_y = cov @ y
+        if np.max(np.abs(y * cov_y - b)) < tol:
+            status = 0
+            break
+        grad = cov_y - b / y
+        step = cho_solve(cho_factor(cov + np.diag(b / y ** 2)), grad)
+
+        #Pas amorti : rester dans y > 0 puis condition d'Armijo
+        t = 1.0
+        negative = step > 0
+        if negative.any():
+            t = min(1.0, 0.99 * np.min(y[negative] / step[negative]))
+        f, slope = objective(y), grad @ step
+        while objective(y - t * step) > f - 1e-4 * t * slope and t > 1e-12:
+            t *= 0.5
+        y = y - t * step
+
+    weights = y / y.sum()
+    result = OptimizeResult(x=weights, nit=nit, success=status == 0, status=status,
+                            message="Converged" if status == 0 else "Maximum number of iterations reached",
+                            fun=float(np.sqrt(weights @ cov @ weights)))
+    return _output(result, return_info)
+
+
+class OptimizationCache:
+    """
+    Cache LRU des solutions d'optimisation, indexé par une empreinte de (mu, cov, stratégie).
+
+    Des fenêtres identiques (balayages de paramètres, backtests relancés) ne sont résolues qu'une fois.
+
+    Args:
+        maxsize: nombre maximal de solutions conservées (les moins récemment utilisées sont évincées)
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._store = OrderedDict()
+
+    @staticmethod
+    def _fingerprint(strategy_fn, expected_returns, cov_matrix, **kwargs) -> tuple:
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(np.ascontiguousarray(expected_returns, dtype=float).tobytes())
+        #Covariance dense ou structurée (FactorCovariance : on hache ses composantes)
+        parts = [cov_matrix.loadings, cov_matrix.factor_cov, cov_matrix.specific_var] if hasattr(cov_matrix, "specific_var") else [cov_matrix]
+        for part in parts:
+            digest.update(np.ascontiguousarray(part, dtype=float).tobytes())
+        #Arguments qui changent la solution (init_weights ne change que le point de départ)
+        for name in sorted(kwargs):
+            if name != 'init_weights':
+                digest.update(name.encode())
+                digest.update(np.ascontiguousarray(kwargs[name], dtype=float).tobytes())
+        return strategy_fn, digest.hexdigest()
+
+    def solve(self, strategy_fn, expected_returns, cov_matrix, **kwargs) -> np.ndarray:
+        """
+        strategy_fn(expected_returns, cov_matrix, **kwargs), ou la solution déjà calculée pour les mêmes entrées
+        """
+        key = self._fingerprint(strategy_fn, expected_returns, cov_matrix, **kwargs)
+        if key in self._store:
+            self.hits += 1
+            count('optimizer.cache_hits')
+            self._store.move_to_end(key)
+            return self._store[key].copy()
+
+        self.misses += 1
+        count('optimizer.cache_misses')
+        weights = np.asarray(strategy_fn(expected_returns, cov_matrix, **kwargs))
+        self._store[key] = weights
+        if len(self._store) > self.maxsize:
+            self._store.popitem(last=False)
+        return weights.copy()
 
-    result = minimize(objective_fn, init_guess, bounds=bounds, constraints=constraints)
-    return result.x
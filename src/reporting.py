@@ -1,104 +1,238 @@
+import os
+
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from matplotlib.backends.backend_pdf import PdfPages
-
-
-def plot_cumulative_returns(cumulative_df: pd.DataFrame, title: str = "Cumulative Returns"):
-    plt.figure(figsize=(12, 6))
-    cumulative_df.plot(ax=plt.gca())
-    plt.title(title)
-    plt.ylabel("Portfolio Value")
-    plt.xlabel("Date")
-    plt.grid(True)
-    plt.tight_layout()
+
+from .risk_metrics import portfolio_metrics
+
+
+def downsample(data, max_points: int = 2000):
+    """
+    Réduit une série longue à ~max_points points pour le tracé, en gardant le min et le max de chaque paquet
+    (les creux de drawdown et les sommets restent visibles, contrairement à un simple pas fixe)
+
+    Args:
+        data (pd.Series | pd.DataFrame): série(s) indexée(s) par date
+        max_points (int): nombre de points visé
+
+    Returns:
+        même type que data, sous-ensemble des lignes (premier et dernier point conservés)
+    """
+    n = len(data)
+    if max_points is None or n <= max_points:
+        return data
+
+    values = np.asarray(data, dtype=float).reshape(n, -1)
+    size = int(np.ceil(2 * n / max_points))
+    n_buckets = int(np.ceil(n / size))
+    #Paquets de taille fixe (dernier paquet complété par la dernière ligne)
+    padded = np.concatenate([values, np.repeat(values[-1:], n_buckets * size - n, axis=0)])
+    padded = np.where(np.isnan(padded), np.nanmean(values, axis=0), padded).reshape(n_buckets, size, -1)
+
+    offsets = np.arange(n_buckets)[:, None] * size
+    lows = offsets + padded.argmin(axis=1)
+    highs = offsets + padded.argmax(axis=1)
+    rows = np.unique(np.concatenate([[0, n - 1], lows.ravel(), highs.ravel()]))
+    return data.iloc[np.minimum(rows, n - 1)]
+
+
+#### Tracés sur des axes explicites (partagés par les fonctions interactives et ReportBuilder)
+
+def _draw_cumulative(ax, cumulative, title: str = "Rendements cumulés", ylabel: str = "Valeur du portefeuille"):
+    cumulative = cumulative.to_frame() if isinstance(cumulative, pd.Series) else cumulative
+    for name, column in cumulative.items():
+        ax.plot(cumulative.index, column.values, label=str(name))
+    if cumulative.shape[1] > 1:
+        ax.legend()
+    ax.set_title(title)
+    ax.set_xlabel("Date")
+    ax.set_ylabel(ylabel)
+    ax.grid(True)
+
+
+def _draw_drawdown(ax, drawdown: pd.Series, title: str = "Drawdown"):
+    ax.plot(drawdown.index, np.asarray(drawdown), color='red')
+    ax.set_title(title)
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Drawdown (%)")
+    ax.grid(True)
+
+
+def _draw_frontier(ax, risks, returns, sharpes, title: str = "Frontière efficiente"):
+    points = ax.scatter(risks, returns, c=sharpes, cmap="viridis", s=100)
+    ax.figure.colorbar(points, ax=ax, label="Sharpe Ratio")
+    ax.set_title(title)
+    ax.set_xlabel("Volatilité")
+    ax.set_ylabel("Rendement attendu")
+    ax.grid(True)
+
+
+def _draw_table(ax, summary, title: str = "Synthèse"):
+    summary = summary.to_frame("Value") if isinstance(summary, pd.Series) else summary
+    cells = [[f"{value:.4f}" if isinstance(value, (float, np.floating)) else str(value) for value in row] for row in summary.values]
+    table = ax.table(cellText=cells, rowLabels=[str(label) for label in summary.index],
+                     colLabels=[str(label) for label in summary.columns], loc='center')
+    table.scale(1, 1.5)
+    ax.set_title(title)
+    ax.axis('off')
+
+
+#### Graphiques interactifs (notebooks)
+
+#matplotlib est importé dans les fonctions : importer reporting ne charge pas matplotlib (~1 s)
+
+def plot_cumulative_returns(cumulative_df: pd.DataFrame, title: str = "Cumulative Returns", max_points: int = 2000):
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(12, 6))
+    _draw_cumulative(ax, downsample(cumulative_df, max_points), title, "Portfolio Value")
+    fig.tight_layout()
     plt.show()
 
 
-def plot_drawdown(cumulative: pd.Series, title: str = "Drawdown"):
+def plot_drawdown(cumulative: pd.Series, title: str = "Drawdown", max_points: int = 2000):
     drawdown = cumulative / cumulative.cummax() - 1
-    plt.figure(figsize=(12, 4))
-    drawdown.plot(color='red')
-    plt.title(title)
-    plt.ylabel("Drawdown (%)")
-    plt.xlabel("Date")
-    plt.grid(True)
-    plt.tight_layout()
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(12, 4))
+    _draw_drawdown(ax, downsample(drawdown, max_points), title)
+    fig.tight_layout()
     plt.show()
 
 
 def plot_efficient_frontier(returns_list: list, risks_list: list, sharpe_list: list):
-    plt.figure(figsize=(10, 6))
-    sns.scatterplot(x=risks_list, y=returns_list, hue=sharpe_list, palette="viridis", s=100)
-    plt.title("Efficient Frontier")
-    plt.xlabel("Volatility")
-    plt.ylabel("Expected Return")
-    plt.colorbar(label="Sharpe Ratio")
-    plt.grid(True)
-    plt.tight_layout()
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(10, 6))
+    _draw_frontier(ax, risks_list, returns_list, sharpe_list, "Efficient Frontier")
+    ax.set_xlabel("Volatility")
+    ax.set_ylabel("Expected Return")
+    fig.tight_layout()
     plt.show()
 
 
 def summary_table(returns: pd.Series) -> pd.DataFrame:
-    cumulative = (1 + returns).cumprod()
-    drawdown = cumulative / cumulative.cummax() - 1
+    stats = portfolio_metrics(returns).iloc[:, 0]
+    stats = stats[["Total Return", "Annualized Return", "Volatility", "Sharpe Ratio", "Max Drawdown"]]
+
+    return stats.to_frame("Value")
 
-    stats = {
-        "Total Return": cumulative.iloc[-1] - 1,
-        "Annualized Return": returns.mean() * 252,
-        "Volatility": returns.std() * np.sqrt(252),
-        "Sharpe Ratio": returns.mean() / returns.std() * np.sqrt(252),
-        "Max Drawdown": drawdown.min()
-    }
 
-    return pd.DataFrame(stats, index=["Value"]).T
+#### Rapports PDF sans affichage
+
+class ReportBuilder:
+    """
+    Génération de rapports PDF sans pyplot : chaque page est une matplotlib.figure.Figure rendue par le backend Agg,
+    sans état global (utilisable dans des threads et des processus serveur, aucune figure ouverte ne reste en mémoire).
+
+    Les drawdowns et tableaux de synthèse déjà calculés sont réutilisés ; les séries longues sont sous-échantillonnées
+    (downsample) avant le tracé. render_batch génère les rapports de nombreux portefeuilles en parallèle.
+
+    Args:
+        max_points: nombre de points par courbe (None -> pas de sous-échantillonnage)
+        dpi: résolution des éléments rastérisés
+    """
+
+    SUMMARY_ROWS = ["Total Return", "Annualized Return", "Volatility", "Sharpe Ratio", "Max Drawdown"]
+
+    def __init__(self, max_points: int = 2000, dpi: int = 100):
+        self.max_points = max_points
+        self.dpi = dpi
+
+    @staticmethod
+    def _figure(figsize: tuple):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+        return fig, fig.subplots()
+
+    def render(self, filename: str, cumulative: pd.Series, drawdown: pd.Series = None, summary=None, frontier_data: dict = None) -> str:
+        """
+        Écrit le rapport d'un portefeuille dans filename
+
+        Args:
+            filename: fichier PDF à créer
+            cumulative: rendements cumulés
+            drawdown: drawdowns déjà calculés (None -> calculés à partir de cumulative)
+            summary: tableau de synthèse déjà calculé (pd.Series ou pd.DataFrame, ex: summary_table), page omise si None
+            frontier_data: dictionnaire avec 'returns', 'risks', 'sharpes' pour la frontière efficiente
+
+        Returns:
+            str: filename
+        """
+        if drawdown is None:
+            values = np.asarray(cumulative, dtype=float)
+            drawdown = pd.Series(values / np.maximum.accumulate(values) - 1, index=cumulative.index)
+
+        from matplotlib.backends.backend_pdf import PdfPages
+
+        with PdfPages(filename) as pdf:
+            fig, ax = self._figure((10, 5))
+            _draw_cumulative(ax, downsample(cumulative, self.max_points))
+            pdf.savefig(fig, dpi=self.dpi)
+
+            fig, ax = self._figure((10, 4))
+            _draw_drawdown(ax, downsample(drawdown, self.max_points))
+            pdf.savefig(fig, dpi=self.dpi)
+
+            if summary is not None:
+                fig, ax = self._figure((8, 4))
+                _draw_table(ax, summary)
+                pdf.savefig(fig, dpi=self.dpi)
+
+            if frontier_data:
+                fig, ax = self._figure((8, 6))
+                _draw_frontier(ax, frontier_data['risks'], frontier_data['returns'], frontier_data['sharpes'])
+                pdf.savefig(fig, dpi=self.dpi)
+
+        return filename
+
+    def render_batch(self, cumulative: pd.DataFrame, output_dir: str, drawdown: pd.DataFrame = None, summary: pd.DataFrame = None, frontier_data: dict = None, n_jobs: int = -1) -> list:
+        """
+        Un rapport par portefeuille (colonne de cumulative), rendus en parallèle dans des processus
+
+        Drawdowns et synthèse, s'ils ne sont pas fournis, sont calculés une seule fois pour tous les portefeuilles
+        (passes vectorisées), et les séries sont sous-échantillonnées avant envoi aux workers.
+
+        Args:
+            cumulative: rendements cumulés (jours x portefeuilles), ex: sortie de compare_strategies
+            output_dir: dossier des PDF (<portefeuille>.pdf)
+            drawdown: drawdowns déjà calculés (jours x portefeuilles, mêmes colonnes), None -> calculés ici
+            summary: synthèse déjà calculée (métriques x portefeuilles, ex: portfolio_metrics), None -> calculée ici
+            frontier_data: frontière efficiente commune à tous les rapports (optionnel)
+            n_jobs: nombre de processus (1 -> séquentiel, -1 -> tous les coeurs)
+
+        Returns:
+            list: chemins des PDF, dans l'ordre des colonnes
+        """
+        if drawdown is None:
+            values = cumulative.values.astype(float)
+            drawdown = pd.DataFrame(values / np.fmax.accumulate(values, axis=0) - 1, index=cumulative.index, columns=cumulative.columns)
+        if summary is None:
+            returns = cumulative.pct_change()
+            returns.iloc[0] = cumulative.iloc[0] - 1  #Valeur initiale normalisée à 1
+            summary = portfolio_metrics(returns)
+        summary = summary.loc[[row for row in self.SUMMARY_ROWS if row in summary.index]]
+
+        os.makedirs(output_dir, exist_ok=True)
+        #Sous-échantillonnage par portefeuille (moins de données à transmettre aux workers)
+        tasks = [(os.path.join(output_dir, f"{name}.pdf"), downsample(cumulative[name], self.max_points),
+                  downsample(drawdown[name], self.max_points), summary[name].to_frame("Value"))
+                 for name in cumulative.columns]
+
+        if n_jobs == 1:
+            return [self.render(path, cum, dd, stats, frontier_data) for path, cum, dd, stats in tasks]
+
+        from joblib import Parallel, delayed
+        return Parallel(n_jobs=n_jobs)(delayed(self.render)(path, cum, dd, stats, frontier_data) for path, cum, dd, stats in tasks)
 
 
 def export_report_pdf(filename: str, cumulative: pd.Series, drawdown: pd.Series, frontier_data: dict = None):
     """
     Exporte les graphiques de performance dans un fichier PDF
-    
+
     Args:
         filename: nom du fichier PDF à créer
         cumulative: série des rendements cumulés
         drawdown: série des drawdowns
         frontier_data: dictionnaire avec 'returns', 'risks', 'sharpes' pour la frontière efficiente
     """
-    with PdfPages(filename) as pdf:
-        # Graphique des rendements cumulés
-        plt.figure(figsize=(10, 5))
-        cumulative.plot()
-        plt.title("Rendements cumulés")
-        plt.xlabel("Date")
-        plt.ylabel("Valeur du portefeuille")
-        plt.grid(True)
-        pdf.savefig()
-        plt.close()
-
-        # Graphique des drawdowns
-        plt.figure(figsize=(10, 4))
-        drawdown.plot(color='red')
-        plt.title("Drawdown")
-        plt.xlabel("Date")
-        plt.ylabel("Drawdown (%)")
-        plt.grid(True)
-        pdf.savefig()
-        plt.close()
-
-        # Graphique de la frontière efficiente (optionnel)
-        if frontier_data:
-            plt.figure(figsize=(8, 6))
-            sns.scatterplot(
-                x=frontier_data['risks'],
-                y=frontier_data['returns'],
-                hue=frontier_data['sharpes'],
-                palette="viridis",
-                s=100
-            )
-            plt.title("Frontière efficiente")
-            plt.xlabel("Volatilité")
-            plt.ylabel("Rendement attendu")
-            plt.grid(True)
-            pdf.savefig()
-            plt.close()
+    ReportBuilder().render(filename, cumulative, drawdown, frontier_data=frontier_data)
@@ -1,6 +1,8 @@
 import numpy as np
 import pandas as pd
 
+from .instrumentation import instrumented
+
 def compute_returns(prices:pd.DataFrame, log:bool = True):
     """
     Calcule les rendements à partir des prix.
@@ -11,9 +13,19 @@ def compute_returns(prices:pd.DataFrame, log:bool = True):
     
     Returns:
         pd.DataFrame: Rendements journaliers.
+    
+    Pour les très grands univers : panel.ReturnsPanel.from_prices (float32, calcul par blocs, mappé sur disque).
     """
     if log:
-        return np.log(prices / prices.shift(1)).dropna() #Rendements logarithmiques
+        #Un seul tableau temporaire (rapport des prix, puis log sur place) au lieu de plusieurs DataFrame float64
+        values = prices.to_numpy(dtype=float)
+        ratio = values[1:] / values[:-1]
+        np.log(ratio, out=ratio)
+        if isinstance(prices, pd.Series):
+            returns = pd.Series(ratio, index=prices.index[1:], name=prices.name, copy=False)
+        else:
+            returns = pd.DataFrame(ratio, index=prices.index[1:], columns=prices.columns, copy=False)
+        return returns.dropna() if np.isnan(ratio).any() else returns #Rendements logarithmiques
     else:
         return prices.pct_change().dropna()  #Rendements simple
     
@@ -43,4 +55,381 @@ def compute_sharpe_ratio(returns: pd.DataFrame, risk_free_rate: float = 0.0) ->
     rf_daily = risk_free_rate / 252 #Taux sans risque annuel -> Journalier (252 jours de bourse / ans)
     excess_return = returns - rf_daily  #Rendement au dessus du taux sans risque pour chaques actifs
     sharpe = excess_return.mean() / excess_return.std()
-    return sharpe * np.sqrt(252)  #Annualisation du sharpe ratio
\ No newline at end of file
+    return sharpe * np.sqrt(252)  #Annualisation du sharpe ratio
+
+#### Métriques de risque extrême, vectorisées sur (jours x portefeuilles)
+
+def _as_frame(returns) -> pd.DataFrame:
+    return returns.to_frame() if isinstance(returns, pd.Series) else returns
+
+
+def _norm():
+    from scipy import stats  #Import paresseux : scipy.stats coûte ~1 s, seules les méthodes paramétriques en ont besoin
+    return stats.norm
+
+
+def _nan_quantile(values: np.ndarray, q: float) -> np.ndarray:
+    #np.quantile est vectorisé ; np.nanquantile ne l'est pas colonne par colonne en présence de NaN
+    return np.nanquantile(values, q, axis=0) if np.isnan(values).any() else np.quantile(values, q, axis=0)
+
+
+def _moments(values: np.ndarray) -> dict:
+    """
+    Moyenne, écart type (ddof=1), skewness et kurtosis en excès par colonne, en une passe sur les écarts centrés
+    """
+    count = (~np.isnan(values)).sum(axis=0)
+    mean = np.nanmean(values, axis=0)
+    centered = values - mean
+    squared = centered ** 2
+    m2 = np.nanmean(squared, axis=0)
+    m3 = np.nanmean(squared * centered, axis=0)
+    m4 = np.nanmean(squared ** 2, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            'mean': mean,
+            'std': np.sqrt(m2 * count / (count - 1)),
+            'skew': m3 / m2 ** 1.5,
+            'kurt': m4 / m2 ** 2 - 3,
+        }
+
+
+def _var(moments: dict, quantile: np.ndarray, alpha: float, method: str) -> np.ndarray:
+    if method == 'historical':
+        return -quantile
+    if method not in ('parametric', 'cornish_fisher'):
+        raise ValueError("method doit être 'historical', 'parametric' ou 'cornish_fisher'.")
+    z = _norm().ppf(1 - alpha)
+    if method == 'cornish_fisher':
+        skew, kurt = moments['skew'], moments['kurt']
+        z = (z + (z ** 2 - 1) * skew / 6 + (z ** 3 - 3 * z) * kurt / 24
+             - (2 * z ** 3 - 5 * z) * skew ** 2 / 36)
+    return -(moments['mean'] + z * moments['std'])
+
+
+def _cvar(values: np.ndarray, moments: dict, quantile: np.ndarray, alpha: float, method: str) -> np.ndarray:
+    if method == 'historical':
+        tail = values <= quantile  #NaN -> False
+        return -np.where(tail, values, 0).sum(axis=0) / tail.sum(axis=0)
+    if method != 'parametric':
+        raise ValueError("method doit être 'historical' ou 'parametric'.")
+    return -(moments['mean'] - moments['std'] * _norm().pdf(_norm().ppf(1 - alpha)) / (1 - alpha))
+
+
+def drawdowns(returns):
+    """
+    Valeur cumulée et drawdown (par rapport au plus haut atteint) de chaque portefeuille
+    
+    Args:
+        returns (pd.Series | pd.DataFrame): Rendements journaliers (jours x portefeuilles)
+    
+    Returns:
+        (cumulative, drawdown): même type et mêmes dimensions que returns
+    """
+    cumulative = (1 + returns).cumprod()
+    drawdown = cumulative / cumulative.cummax() - 1
+    return cumulative, drawdown
+
+
+def value_at_risk(returns, alpha: float = 0.95, method: str = 'historical') -> pd.Series:
+    """
+    VaR journalière (perte positive) au niveau alpha
+    
+    Args:
+        returns (pd.DataFrame): Rendements journaliers (jours x portefeuilles)
+        alpha (float): Niveau de confiance
+        method (str): 'historical', 'parametric' (normale) ou 'cornish_fisher' (corrigée de l'asymétrie et du kurtosis)
+    
+    Returns:
+        pd.Series: VaR par portefeuille
+    """
+    returns = _as_frame(returns)
+    values = returns.values.astype(float)
+    quantile = _nan_quantile(values, 1 - alpha) if method == 'historical' else None
+    moments = _moments(values) if method != 'historical' else None
+    return pd.Series(_var(moments, quantile, alpha, method), index=returns.columns)
+
+
+def conditional_value_at_risk(returns, alpha: float = 0.95, method: str = 'historical') -> pd.Series:
+    """
+    CVaR / Expected Shortfall journalière : perte moyenne au-delà de la VaR
+    
+    Args:
+        returns (pd.DataFrame): Rendements journaliers (jours x portefeuilles)
+        alpha (float): Niveau de confiance
+        method (str): 'historical' ou 'parametric' (normale)
+    
+    Returns:
+        pd.Series: CVaR par portefeuille
+    """
+    returns = _as_frame(returns)
+    values = returns.values.astype(float)
+    quantile = _nan_quantile(values, 1 - alpha) if method == 'historical' else None
+    moments = _moments(values) if method != 'historical' else None
+    return pd.Series(_cvar(values, moments, quantile, alpha, method), index=returns.columns)
+
+
+def max_drawdown_duration(drawdown) -> pd.Series:
+    """
+    Plus longue période (en jours) passée sous un plus haut précédent, pour chaque portefeuille
+    """
+    drawdown = _as_frame(drawdown)
+    return pd.Series(_max_duration(drawdown.values), index=drawdown.columns)
+
+
+def _max_duration(drawdown: np.ndarray) -> np.ndarray:
+    days = np.arange(len(drawdown))[:, None]
+    last_peak = np.maximum.accumulate(np.where(drawdown < 0, -1, days), axis=0)
+    return (days - last_peak).max(axis=0, initial=0)
+
+
+@instrumented()
+def portfolio_metrics(returns, risk_free_rate: float = 0.0, alpha: float = 0.95, periods: int = 252) -> pd.DataFrame:
+    """
+    Toutes les métriques de performance et de risque de milliers de portefeuilles en une seule passe vectorisée
+    
+    Args:
+        returns (pd.Series | pd.DataFrame): Rendements journaliers (jours x portefeuilles)
+        risk_free_rate (float): Taux sans risque annuel
+        alpha (float): Niveau de confiance des VaR / CVaR
+        periods (int): Nombre de périodes par an
+    
+    Returns:
+        pd.DataFrame: métriques x portefeuilles
+    """
+    returns = _as_frame(returns)
+    values = returns.values.astype(float)
+    rf = risk_free_rate / periods
+
+    #Moments, quantile de queue et drawdowns calculés une seule fois puis partagés entre métriques
+    moments = _moments(values)
+    quantile = _nan_quantile(values, 1 - alpha)
+    cumulative = np.cumprod(1 + np.nan_to_num(values), axis=0)  #NaN -> rendement nul, comme cumprod de pandas
+    drawdown = cumulative / np.maximum.accumulate(cumulative, axis=0) - 1
+
+    mean, std = moments['mean'], moments['std']
+    downside = np.sqrt(np.nanmean(np.minimum(values - rf, 0) ** 2, axis=0))
+    annual_return = mean * periods
+    max_dd = drawdown.min(axis=0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        metrics = {
+            'Total Return': cumulative[-1] - 1,
+            'Annualized Return': annual_return,
+            'Volatility': std * np.sqrt(periods),
+            'Sharpe Ratio': (mean - rf) / std * np.sqrt(periods),
+            'Sortino Ratio': (mean - rf) / downside * np.sqrt(periods),
+            'Max Drawdown': max_dd,
+            'Max Drawdown Duration': _max_duration(drawdown),
+            'Calmar Ratio': annual_return / np.abs(max_dd),
+            'VaR (historical)': _var(moments, quantile, alpha, 'historical'),
+            'VaR (parametric)': _var(moments, quantile, alpha, 'parametric'),
+            'VaR (Cornish-Fisher)': _var(moments, quantile, alpha, 'cornish_fisher'),
+            'CVaR (historical)': _cvar(values, moments, quantile, alpha, 'historical'),
+            'CVaR (parametric)': _cvar(values, moments, quantile, alpha, 'parametric'),
+        }
+    return pd.DataFrame(metrics, index=returns.columns).T
+
+
+@instrumented()
+def rolling_metrics(returns, window: int = 252, risk_free_rate: float = 0.0, alpha: float = 0.95, periods: int = 252) -> dict:
+    """
+    Versions glissantes des principales métriques (fenêtres pandas, vectorisées sur les portefeuilles)
+    
+    Returns:
+        dict: {'Volatility', 'Sharpe Ratio', 'Sortino Ratio', 'VaR (historical)', 'VaR (parametric)'} -> pd.DataFrame (jours x portefeuilles)
+    """
+    returns = _as_frame(returns).astype(float)
+    rf = risk_free_rate / periods
+    rolling = returns.rolling(window)
+    mean, std = rolling.mean(), rolling.std()
+    downside = np.sqrt((np.minimum(returns - rf, 0) ** 2).rolling(window).mean())
+
+    return {
+        'Volatility': std * np.sqrt(periods),
+        'Sharpe Ratio': (mean - rf) / std * np.sqrt(periods),
+        'Sortino Ratio': (mean - rf) / downside * np.sqrt(periods),
+        'VaR (historical)': -rolling.quantile(1 - alpha),
+        'VaR (parametric)': -(mean + _norm().ppf(1 - alpha) * std),
+    }
+
+#### Simulation Monte Carlo du risque futur
+
+def _simulate_chunk(seed, n_paths: int, horizon: int, method: str, mean: np.ndarray, chol: np.ndarray, df: float, history: np.ndarray, block_size: int):
+    """
+    Simule n_paths trajectoires de rendements des portefeuilles et ne renvoie que leurs statistiques
+    (P&L final et drawdown maximal) -> mémoire bornée par la taille du paquet
+    """
+    rng = np.random.default_rng(seed)
+    m = len(mean) if history is None else history.shape[1]
+
+    if method == 'bootstrap':
+        #Tirage de blocs de jours historiques (block_size=1 -> bootstrap iid)
+        n_blocks = -(-horizon // block_size)
+        starts = rng.integers(0, len(history) - block_size + 1, size=(n_paths, n_blocks))
+        days = (starts[:, :, None] + np.arange(block_size)).reshape(n_paths, -1)[:, :horizon]
+        paths = history[days]
+    else:
+        z = rng.standard_normal((n_paths, horizon, m)) @ chol.T
+        if method == 'student_t':
+            #Student-t multivarié, mis à l'échelle pour que sa covariance soit celle estimée
+            scale = np.sqrt((df - 2) / rng.chisquare(df, size=(n_paths, horizon, 1)))
+            z *= scale
+        paths = mean + z
+
+    wealth = np.cumprod(1 + paths, axis=1)
+    running_max = np.maximum(np.maximum.accumulate(wealth, axis=1), 1.0)
+    max_drawdown = (wealth / running_max - 1).min(axis=1)
+    return wealth[:, -1] - 1, max_drawdown
+
+
+class _Smallest:
+    """
+    k plus petites valeurs par colonne d'une suite de paquets (ordre quelconque)
+    
+    Les paquets s'accumulent jusqu'à 2k lignes avant d'être réduits à k par np.partition : chaque réduction
+    coûte O(k + paquet) pour au moins k nouvelles lignes, soit un coût total linéaire en nombre de lignes.
+    """
+
+    def __init__(self, k: int):
+        self.k = k
+        self.parts = []
+        self.size = 0
+
+    def add(self, values: np.ndarray):
+        self.parts.append(values)
+        self.size += len(values)
+        if self.size > 2 * self.k:
+            self._reduce()
+
+    def _reduce(self):
+        values = np.concatenate(self.parts)
+        if len(values) > self.k:
+            values = np.partition(values, self.k - 1, axis=0)[:self.k]
+        self.parts, self.size = [values], len(values)
+
+    def values(self) -> np.ndarray:
+        self._reduce()
+        return self.parts[0]
+
+
+def _low_quantile(smallest: np.ndarray, n: int, q: float) -> np.ndarray:
+    """
+    Quantile q (interpolation linéaire, comme np.quantile) de n valeurs dont on connaît les plus petites
+    """
+    position = (n - 1) * q
+    lo = int(np.floor(position))
+    ordered = np.sort(smallest, axis=0)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (position - lo) * (ordered[hi] - ordered[lo])
+
+
+_DRAWDOWN_BINS = np.linspace(-1.0, 0.0, 20_001)  #Histogramme des drawdowns maximaux (pas de 5e-5)
+
+
+@instrumented()
+def monte_carlo_risk(weights, returns: pd.DataFrame = None, mu: np.ndarray = None, cov: np.ndarray = None, horizon: int = 21, n_paths: int = 100_000, method: str = 'normal', df: float = 5.0, alpha: float = 0.95, block_size: int = 1, chunk_size: int = 10_000, n_jobs: int = 1, seed: int = None, return_paths: bool = False) -> dict:
+    """
+    Distribution simulée du P&L futur d'un ou plusieurs portefeuilles (poids fixes)
+    
+    Pour des poids fixes, tirer les rendements des actifs puis les projeter sur les poids équivaut exactement
+    à tirer les rendements des portefeuilles de moyenne W·mu et de covariance W·cov·W' : la simulation se fait
+    donc en dimension (nombre de portefeuilles) et non (nombre d'actifs).
+    
+    Chaque paquet est réduit dès qu'il est simulé : sommes, plus petites valeurs nécessaires aux quantiles de
+    queue (VaR, CVaR et pire 5% des drawdowns, exacts) et histogramme des drawdowns (médiane à 5e-5 près).
+    Mémoire : un paquet + les (1-alpha)·n_paths et 5%·n_paths pires trajectoires par portefeuille, sauf si return_paths.
+    
+    Args:
+        weights: poids (n,) ou (portefeuilles x n), np.ndarray ou pd.DataFrame (index = noms des portefeuilles)
+        returns: rendements journaliers historiques (requis pour 'bootstrap', sinon sert à estimer mu et cov)
+        mu: rendements moyens journaliers des actifs
+        cov: covariance journalière des actifs
+        horizon: horizon de simulation (jours)
+        n_paths: nombre de trajectoires
+        method: 'normal', 'student_t' ou 'bootstrap' (rééchantillonnage des rendements historiques)
+        df: degrés de liberté de la loi de Student (> 2)
+        alpha: niveau de confiance de la VaR / CVaR
+        block_size: taille des blocs de jours pour le bootstrap (1 -> iid)
+        chunk_size: trajectoires simulées par paquet (borne la mémoire)
+        n_jobs: nombre de processus (1 -> séquentiel)
+        seed: graine -> résultats identiques quel que soit n_jobs
+        return_paths: si True, retourne aussi 'pnl' et 'max_drawdown' de toutes les trajectoires (n_paths x portefeuilles)
+    
+    Returns:
+        dict: 'summary' (pd.DataFrame des métriques par portefeuille), et 'pnl', 'max_drawdown' si return_paths
+    """
+    names = weights.index if isinstance(weights, pd.DataFrame) else None
+    W = np.atleast_2d(np.asarray(weights, dtype=float))
+    p = len(W)
+
+    history = mean = chol = None
+    if method == 'bootstrap':
+        history = np.asarray(returns, dtype=float) @ W.T
+    elif method in ('normal', 'student_t'):
+        if mu is None:
+            mu = returns.mean().values
+        if cov is None:
+            cov = returns.cov().values
+        mean = W @ np.asarray(mu, dtype=float)
+        port_cov = W @ np.asarray(cov, dtype=float) @ W.T
+        chol = np.linalg.cholesky(port_cov + 1e-18 * np.eye(p))
+    else:
+        raise ValueError("method doit être 'normal', 'student_t' ou 'bootstrap'.")
+
+    #Une sous-graine par paquet : même résultat en séquentiel ou en parallèle
+    sizes = [min(chunk_size, n_paths - start) for start in range(0, n_paths, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = (horizon, method, mean, chol, df, history, block_size)
+
+    if n_jobs == 1:
+        chunks = (_simulate_chunk(s, size, *args) for s, size in zip(seeds, sizes))
+    else:
+        from joblib import Parallel, delayed
+        #Générateur : chaque paquet est réduit à son arrivée au lieu d'être conservé jusqu'à la fin
+        chunks = Parallel(n_jobs=n_jobs, return_as="generator")(delayed(_simulate_chunk)(s, size, *args) for s, size in zip(seeds, sizes))
+
+    #Nombre de plus petites valeurs nécessaires aux quantiles (1-alpha) et 5% (interpolation linéaire)
+    k_pnl = min(int(np.floor((n_paths - 1) * (1 - alpha))) + 2, n_paths)
+    k_dd = min(int(np.floor((n_paths - 1) * 0.05)) + 2, n_paths)
+    pnl_sum = np.zeros(p)
+    losses = np.zeros(p)
+    worst_pnl, worst_dd = _Smallest(k_pnl), _Smallest(k_dd)
+    dd_hist = np.zeros((len(_DRAWDOWN_BINS) - 1, p))
+    paths = []
+
+    for pnl, max_drawdown in chunks:
+        pnl_sum += pnl.sum(axis=0)
+        losses += (pnl < 0).sum(axis=0)
+        worst_pnl.add(pnl)
+        worst_dd.add(max_drawdown)
+        #Classes de largeur constante : indice direct, puis un seul bincount pour tous les portefeuilles
+        bins = np.clip(((max_drawdown + 1) * (len(_DRAWDOWN_BINS) - 1)).astype(np.int64), 0, len(_DRAWDOWN_BINS) - 2)
+        dd_hist += np.bincount((bins * p + np.arange(p)).ravel(), minlength=dd_hist.size).reshape(dd_hist.shape)
+        if return_paths:
+            paths.append((pnl, max_drawdown))
+
+    worst_pnl, worst_dd = worst_pnl.values(), worst_dd.values()
+    var = -_low_quantile(worst_pnl, n_paths, 1 - alpha)
+    tail = worst_pnl <= -var
+    #Médiane des drawdowns : interpolation dans la classe de l'histogramme qui contient la moitié des trajectoires
+    cumulative = np.cumsum(dd_hist, axis=0)
+    half = n_paths / 2
+    k = (cumulative < half).sum(axis=0)
+    below = np.where(k > 0, cumulative[np.maximum(k - 1, 0), np.arange(p)], 0)
+    width = _DRAWDOWN_BINS[1] - _DRAWDOWN_BINS[0]
+    median_dd = _DRAWDOWN_BINS[k] + width * (half - below) / dd_hist[k, np.arange(p)]
+
+    summary = pd.DataFrame({
+        'Expected P&L': pnl_sum / n_paths,
+        'VaR': var,
+        'CVaR': -(worst_pnl * tail).sum(axis=0) / tail.sum(axis=0),
+        'Prob Loss': losses / n_paths,
+        'Max Drawdown (median)': median_dd,
+        'Max Drawdown (worst 5%)': _low_quantile(worst_dd, n_paths, 0.05),
+    }, index=names)
+
+    result = {'summary': summary}
+    if return_paths:
+        result['pnl'] = np.concatenate([c[0] for c in paths])
+        result['max_drawdown'] = np.concatenate([c[1] for c in paths])
+    return result